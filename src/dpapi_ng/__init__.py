@@ -7,14 +7,18 @@ from ._client import (
     KeyCache,
     async_ncrypt_protect_secret,
     async_ncrypt_unprotect_secret,
+    async_ncrypt_unprotect_secrets,
     ncrypt_protect_secret,
     ncrypt_unprotect_secret,
+    ncrypt_unprotect_secrets,
 )
 
 __all__ = [
     "KeyCache",
     "async_ncrypt_protect_secret",
     "async_ncrypt_unprotect_secret",
+    "async_ncrypt_unprotect_secrets",
     "ncrypt_protect_secret",
     "ncrypt_unprotect_secret",
+    "ncrypt_unprotect_secrets",
 ]
@@ -597,6 +597,41 @@ class ASN1Writer:
         """
         self._data.extend(_pack_asn1_object_identifier(value, tag=tag))
 
+    def write_raw_object_identifier(
+        self,
+        value: bytes,
+        tag: t.Optional[ASN1Tag] = None,
+    ) -> None:
+        """Write an already encoded ASN.1 OBJECT_IDENTIFIER value.
+
+        Writes an object identifier that has already been encoded with
+        :func:`encode_object_identifier`. This avoids having to parse the
+        string representation of constant OIDs on every write.
+
+        Args:
+            value: The encoded object identifier to write.
+            tag: Optional tag to use with the value, defaults to the
+                OBJECT_IDENTIFIER universal tag.
+        """
+        if not tag:
+            tag = ASN1Tag.universal_tag(TypeTagNumber.OBJECT_IDENTIFIER)
+
+        self._data.extend(_pack_asn1(tag.tag_class, tag.is_constructed, tag.tag_number, value))
+
+    def write_raw(
+        self,
+        data: bytes,
+    ) -> None:
+        """Write already encoded ASN.1 data.
+
+        Writes the bytes as is, they must already be a complete ASN.1 encoded
+        value.
+
+        Args:
+            data: The encoded ASN.1 data to write.
+        """
+        self._data.extend(data)
+
     def get_data(self) -> bytearray:
         """Gets the data written to the writer.
 
@@ -777,10 +812,10 @@ def _pack_asn1_object_identifier(
     if not tag:
         tag = ASN1Tag.universal_tag(TypeTagNumber.OBJECT_IDENTIFIER)
 
-    return _pack_asn1(tag.tag_class, tag.is_constructed, tag.tag_number, _encode_object_identifier(value))
+    return _pack_asn1(tag.tag_class, tag.is_constructed, tag.tag_number, encode_object_identifier(value))
 
 
-def _encode_object_identifier(oid: str) -> bytes:
+def encode_object_identifier(oid: str) -> bytes:
     """Encode an object identifier."""
     cmps = list(map(int, oid.split(".")))
     if cmps[0] > 39 or cmps[1] > 39:
@@ -3,21 +3,44 @@
 
 from __future__ import annotations
 
+import codecs
 import dataclasses
+import functools
+import struct
+import sys
 import typing as t
 import uuid
 
-from ._asn1 import ASN1Reader, ASN1Tag, ASN1Writer, TagClass, TypeTagNumber
+from ._asn1 import (
+    ASN1Reader,
+    ASN1Tag,
+    ASN1Writer,
+    TagClass,
+    TypeTagNumber,
+    encode_object_identifier,
+)
 from ._pkcs7 import (
     ContentInfo,
     EnvelopedData,
     KEKRecipientInfo,
     NCryptProtectionDescriptor,
 )
-from ._security_descriptor import ace_to_bytes, sd_to_bytes
+from ._security_descriptor import protection_sd_to_bytes
+
+# version, magic, flags, l0, l1, l2, root_key_identifier, key_info_len,
+# domain_len, forest_len
+_KEY_IDENTIFIER_HEADER = struct.Struct("<I4sIIII16sIII")
+
+# Accepts any buffer so the names can be decoded without copying the view.
+_decode_utf16le = codecs.utf_16_le_decode
+
+_NUL16 = b"\x00\x00"
+
+# dataclass(slots=True) was only added in Python 3.10.
+_DATACLASS_SLOTS: t.Dict[str, t.Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, **_DATACLASS_SLOTS)
 class KeyIdentifier:
     """Key Identifier.
 
@@ -32,50 +55,73 @@ class KeyIdentifier:
         l0: The L0 index of the key
         l1: The L1 index of the key
         l2: The L2 index of the key
-        root_key_identifier: The key identifier
+        root_key_identifier_bytes_le: The root key identifier as the little
+            endian UUID bytes.
         key_info: If is_public_key this is the public key, else it is the key
             KDF context value.
         domain_name: The domain name of the server in DNS format.
         forest_name: The forest name of the server in DNS format.
     """
 
+    magic: t.ClassVar[bytes] = b"\x4B\x44\x53\x4B"
+
     version: int
-    magic: bytes = dataclasses.field(init=False, repr=False, default=b"\x4B\x44\x53\x4B")
     flags: int
     l0: int
     l1: int
     l2: int
-    root_key_identifier: uuid.UUID
+    root_key_identifier_bytes_le: bytes
     key_info: bytes
     domain_name: str
     forest_name: str
+    _cached_pack: t.Optional[bytes] = dataclasses.field(init=False, repr=False, compare=False, default=None)
+    _cached_root_key_identifier: t.Optional[uuid.UUID] = dataclasses.field(
+        init=False, repr=False, compare=False, default=None
+    )
 
     @property
     def is_public_key(self) -> bool:
         return bool(self.flags & 1)
 
+    @property
+    def root_key_identifier(self) -> uuid.UUID:
+        """The root key identifier."""
+        # Built on first access as the decrypt paths read it multiple times.
+        if self._cached_root_key_identifier is None:
+            object.__setattr__(
+                self,
+                "_cached_root_key_identifier",
+                uuid.UUID(bytes_le=self.root_key_identifier_bytes_le),
+            )
+
+        return t.cast(uuid.UUID, self._cached_root_key_identifier)
+
     def pack(self) -> bytes:
-        b_domain_name = (self.domain_name + "\00").encode("utf-16-le")
-        b_forest_name = (self.forest_name + "\00").encode("utf-16-le")
-
-        return b"".join(
-            [
-                self.version.to_bytes(4, byteorder="little"),
-                self.magic,
-                self.flags.to_bytes(4, byteorder="little"),
-                self.l0.to_bytes(4, byteorder="little"),
-                self.l1.to_bytes(4, byteorder="little"),
-                self.l2.to_bytes(4, byteorder="little"),
-                self.root_key_identifier.bytes_le,
-                len(self.key_info).to_bytes(4, byteorder="little"),
-                len(b_domain_name).to_bytes(4, byteorder="little"),
-                len(b_forest_name).to_bytes(4, byteorder="little"),
-                self.key_info,
-                b_domain_name,
-                b_forest_name,
-            ]
+        # The structure is frozen so the packed value can be reused.
+        if self._cached_pack is not None:
+            return self._cached_pack
+
+        b_domain_name = self.domain_name.encode("utf-16-le") + _NUL16
+        b_forest_name = self.forest_name.encode("utf-16-le") + _NUL16
+
+        header = _KEY_IDENTIFIER_HEADER.pack(
+            self.version,
+            self.magic,
+            self.flags,
+            self.l0,
+            self.l1,
+            self.l2,
+            self.root_key_identifier_bytes_le,
+            len(self.key_info),
+            len(b_domain_name),
+            len(b_forest_name),
         )
 
+        data = header + self.key_info + b_domain_name + b_forest_name
+        object.__setattr__(self, "_cached_pack", data)
+
+        return data
+
     @classmethod
     def unpack(
         cls,
@@ -83,30 +129,45 @@ class KeyIdentifier:
     ) -> KeyIdentifier:
         view = memoryview(data)
 
-        version = int.from_bytes(view[:4], byteorder="little")
-
-        if view[4:8].tobytes() != cls.magic:
+        if view[4:8] != cls.magic:
             raise ValueError(f"Failed to unpack {cls.__name__} as magic identifier is invalid")
 
-        flags = int.from_bytes(view[8:12], byteorder="little")
-        l0_index = int.from_bytes(view[12:16], byteorder="little")
-        l1_index = int.from_bytes(view[16:20], byteorder="little")
-        l2_index = int.from_bytes(view[20:24], byteorder="little")
-        root_key_identifier = uuid.UUID(bytes_le=view[24:40].tobytes())
-        key_info_len = int.from_bytes(view[40:44], byteorder="little")
-        domain_len = int.from_bytes(view[44:48], byteorder="little")
-        forest_len = int.from_bytes(view[48:52], byteorder="little")
-        view = view[52:]
-
-        key_info = view[:key_info_len].tobytes()
-        view = view[key_info_len:]
-
-        # Take away 2 for the final null padding
-        domain = view[: domain_len - 2].tobytes().decode("utf-16-le")
-        view = view[domain_len:]
-
-        forest = view[: forest_len - 2].tobytes().decode("utf-16-le")
-        view = view[forest_len:]
+        if len(view) < _KEY_IDENTIFIER_HEADER.size:
+            raise ValueError(f"Failed to unpack {cls.__name__} as data is too short")
+
+        (
+            version,
+            _,
+            flags,
+            l0_index,
+            l1_index,
+            l2_index,
+            b_root_key_identifier,
+            key_info_len,
+            domain_len,
+            forest_len,
+        ) = _KEY_IDENTIFIER_HEADER.unpack_from(view)
+
+        # Slice the variable length fields by offset rather than re-slicing
+        # the view after each field. A bytes input can be sliced directly
+        # without going through the view.
+        offset = _KEY_IDENTIFIER_HEADER.size
+        domain_offset = offset + key_info_len
+        forest_offset = domain_offset + domain_len
+
+        if isinstance(data, bytes):
+            key_info = data[offset:domain_offset]
+        else:
+            key_info = view[offset:domain_offset].tobytes()
+
+        # Take away 2 for the final null padding, a length of 2 is an empty
+        # string which is common for workgroup hosts.
+        domain = "" if domain_len == 2 else _decode_utf16le(view[domain_offset : forest_offset - 2], "strict", True)[0]
+        forest = (
+            ""
+            if forest_len == 2
+            else _decode_utf16le(view[forest_offset : forest_offset + forest_len - 2], "strict", True)[0]
+        )
 
         return KeyIdentifier(
             version=version,
@@ -114,18 +175,15 @@ class KeyIdentifier:
             l0=l0_index,
             l1=l1_index,
             l2=l2_index,
-            root_key_identifier=root_key_identifier,
+            root_key_identifier_bytes_le=b_root_key_identifier,
             key_info=key_info,
             domain_name=domain,
             forest_name=forest,
         )
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**_DATACLASS_SLOTS)
 class DPAPINGBlob:
-    MICROSOFT_SOFTWARE_OID = "1.3.6.1.4.1.311.74.1"
-    MICROSOFT_SOFTWARE_SYSTEMS_OID = "1.3.6.1.4.1.311.74.1.1"
-
     """DPAPI NG Blob.
 
     The unpacked DPAPI NG blob that contains the information needed to decrypt
@@ -135,7 +193,7 @@ class DPAPINGBlob:
 
     Args:
         key_identifier: The key identifier for the KEK.
-        security_descriptor: The Security Descriptor that protects the key.
+        protection_descriptor: The SID the key is protected with.
         enc_cek: The encrypted CEK.
         enc_cek_algorithm: The encrypted CEK algorithm OID.
         enc_cek_parameters: The encrypted CEK algorithm parameters.
@@ -144,33 +202,52 @@ class DPAPINGBlob:
         enc_content_parameters: The encrypted content parameters.
     """
 
+    MICROSOFT_SOFTWARE_OID: t.ClassVar[str] = "1.3.6.1.4.1.311.74.1"
+    MICROSOFT_SOFTWARE_SYSTEMS_OID: t.ClassVar[str] = "1.3.6.1.4.1.311.74.1.1"
+
+    # The OIDs written on every pack are encoded once on import.
+    _ENVELOPED_DATA_OID_ENCODED: t.ClassVar[bytes] = encode_object_identifier(
+        EnvelopedData.CONTENT_TYPE_ENVELOPED_DATA_OID
+    )
+    _DATA_OID_ENCODED: t.ClassVar[bytes] = encode_object_identifier(EnvelopedData.CONTENT_TYPE_DATA_OID)
+    _MICROSOFT_SOFTWARE_OID_ENCODED: t.ClassVar[bytes] = encode_object_identifier(MICROSOFT_SOFTWARE_OID)
+    _MICROSOFT_SOFTWARE_SYSTEMS_OID_ENCODED: t.ClassVar[bytes] = encode_object_identifier(
+        MICROSOFT_SOFTWARE_SYSTEMS_OID
+    )
+
     key_identifier: KeyIdentifier
-    security_descriptor: bytes
+    protection_descriptor: str
     enc_cek: bytes
     enc_cek_algorithm: str
     enc_cek_parameters: t.Optional[bytes]
-    enc_content: bytes
+    enc_content: t.Union[bytes, memoryview]
     enc_content_algorithm: str
     enc_content_parameters: t.Optional[bytes]
+    _security_descriptor: t.Optional[bytes] = dataclasses.field(init=False, repr=False, compare=False, default=None)
+
+    @property
+    def security_descriptor(self) -> bytes:
+        """The Security Descriptor that protects the key."""
+        if self._security_descriptor is None:
+            self._security_descriptor = protection_sd_to_bytes(self.protection_descriptor)
+
+        return self._security_descriptor
 
     def pack(
         self,
-        protection_descriptor: str,
         blob_in_envelope: bool = True,
     ) -> bytes:
         """
         Args:
-            protection_descriptor: The protection descriptor to embed in the EnvelopedData structure.
             blob_in_envelope: True to store the encrypted blob in the EnvelopedData structure (NCryptProtectSecret general),
                 False to append the encrypted blob after the EnvelopedData structure (LAPS style).
 
         Returns:
             bytes: The DPAPI NG Blob data.
         """
-        # TODO: it's not very nice to pass protection_descriptor as separate parameter here, should be extracted from self.security_descriptor
         writer = ASN1Writer()
         with writer.push_sequence() as ContentInfo:
-            ContentInfo.write_object_identifier(EnvelopedData.CONTENT_TYPE_ENVELOPED_DATA_OID)
+            ContentInfo.write_raw_object_identifier(DPAPINGBlob._ENVELOPED_DATA_OID_ENCODED)
             with ContentInfo.push_sequence(
                 ASN1Tag(tag_class=TagClass.CONTEXT_SPECIFIC, tag_number=0, is_constructed=True)
             ) as Content:
@@ -183,45 +260,27 @@ class DPAPINGBlob:
                             recipient_info.write_integer(4)  # KEKRecipientInfo CMSVersion
                             with recipient_info.push_sequence() as key_agree_recipient_info:
                                 key_agree_recipient_info.write_octet_string(self.key_identifier.pack())
-                                with key_agree_recipient_info.push_sequence() as originator:
-                                    originator.write_object_identifier(DPAPINGBlob.MICROSOFT_SOFTWARE_OID)
-                                    with originator.push_sequence() as originator_sequence:
-                                        originator_sequence.write_object_identifier(
-                                            DPAPINGBlob.MICROSOFT_SOFTWARE_SYSTEMS_OID
-                                        )
-                                        with originator_sequence.push_sequence() as originator_sequence_2:
-                                            with originator_sequence_2.push_sequence() as originator_sequence_3:
-                                                with originator_sequence_3.push_sequence() as originator_sequence_4:
-                                                    originator_sequence_4.write_octet_string(
-                                                        b"SID", ASN1Tag.universal_tag(TypeTagNumber.UTF8_STRING)
-                                                    )
-                                                    originator_sequence_4.write_octet_string(
-                                                        protection_descriptor.encode("utf-8"),
-                                                        ASN1Tag.universal_tag(TypeTagNumber.UTF8_STRING),
-                                                    )
+                                key_agree_recipient_info.write_raw(_pack_originator_sid(self.protection_descriptor))
                             with recipient_info.push_sequence() as kek_recipient_info:
                                 kek_recipient_info.write_object_identifier(self.enc_cek_algorithm)
                             recipient_info.write_octet_string(self.enc_cek)
                     with enveloped_data.push_sequence() as encrypted_content_info:
-                        encrypted_content_info.write_object_identifier(EnvelopedData.CONTENT_TYPE_DATA_OID)
+                        encrypted_content_info.write_raw_object_identifier(DPAPINGBlob._DATA_OID_ENCODED)
                         with encrypted_content_info.push_sequence() as content_encryption_algorithm_identifier:
                             content_encryption_algorithm_identifier.write_object_identifier(self.enc_content_algorithm)
                             if self.enc_content_parameters:
-                                content_encryption_algorithm_identifier._data.extend(self.enc_content_parameters)
-                            else:
-                                content_encryption_algorithm_identifier._data.extend(b"")
+                                content_encryption_algorithm_identifier.write_raw(self.enc_content_parameters)
                         if blob_in_envelope:
                             encrypted_content_info.write_octet_string(
                                 self.enc_content,
                                 tag=ASN1Tag(tag_class=TagClass.CONTEXT_SPECIFIC, tag_number=0, is_constructed=False),
                             )
 
-        return b"".join(
-            [
-                writer.get_data(),
-                self.enc_content if not blob_in_envelope else b"",
-            ]
-        )
+        data = writer.get_data()
+        if not blob_in_envelope:
+            data.extend(self.enc_content)
+
+        return bytes(data)
 
     @classmethod
     def unpack(
@@ -237,15 +296,14 @@ class DPAPINGBlob:
             raise ValueError(f"DPAPI-NG blob content type '{content_info.content_type}' is unsupported")
         enveloped_data = EnvelopedData.unpack(content_info.content)
 
-        if (
-            enveloped_data.version != 2
-            or len(enveloped_data.recipient_infos) != 1
-            or not isinstance(enveloped_data.recipient_infos[0], KEKRecipientInfo)
-            or enveloped_data.recipient_infos[0].version != 4
-        ):
-            raise ValueError(f"DPAPI-NG blob is not in the expected format")
+        recipient_infos = enveloped_data.recipient_infos
+        if enveloped_data.version != 2 or len(recipient_infos) != 1:
+            raise ValueError("DPAPI-NG blob is not in the expected format")
+
+        kek_info = recipient_infos[0]
+        if not isinstance(kek_info, KEKRecipientInfo) or kek_info.version != 4:
+            raise ValueError("DPAPI-NG blob is not in the expected format")
 
-        kek_info = enveloped_data.recipient_infos[0]
         key_identifier = KeyIdentifier.unpack(kek_info.kekid.key_identifier)
 
         if not kek_info.kekid.other or kek_info.kekid.other.key_attr_id != DPAPINGBlob.MICROSOFT_SOFTWARE_OID:
@@ -258,24 +316,14 @@ class DPAPINGBlob:
         ):
             raise ValueError(f"DPAPI-NG protection descriptor type '{protection_descriptor.type}' is unsupported")
 
-        # Build the target security descriptor from the SID passed in. This SD
-        # contains an ACE per target user with a mask of 0x3 and a final ACE of
-        # the current user with a mask of 0x2. When viewing this over the wire
-        # the current user is set as S-1-1-0 (World) and the owner/group is
-        # S-1-5-18 (SYSTEM).
-        target_sd = sd_to_bytes(
-            owner="S-1-5-18",
-            group="S-1-5-18",
-            dacl=[ace_to_bytes(protection_descriptor.value, 3), ace_to_bytes("S-1-1-0", 2)],
-        )
-
         # Some DPAPI blobs don't include the content in the PKCS7 payload but
-        # just append after the blob.
-        enc_content = enveloped_data.encrypted_content_info.content or remaining_data.tobytes()
+        # just append after the blob. This is kept as a view to avoid copying
+        # the ciphertext.
+        enc_content: t.Union[bytes, memoryview] = enveloped_data.encrypted_content_info.content or remaining_data
 
         return DPAPINGBlob(
             key_identifier=key_identifier,
-            security_descriptor=target_sd,
+            protection_descriptor=protection_descriptor.value,
             enc_cek=kek_info.encrypted_key,
             enc_cek_algorithm=kek_info.key_encryption_algorithm.algorithm,
             enc_cek_parameters=kek_info.key_encryption_algorithm.parameters,
@@ -283,3 +331,36 @@ class DPAPINGBlob:
             enc_content_algorithm=enveloped_data.encrypted_content_info.algorithm.algorithm,
             enc_content_parameters=enveloped_data.encrypted_content_info.algorithm.parameters,
         )
+
+
+@functools.lru_cache(maxsize=128)
+def _pack_originator_sid(protection_descriptor: str) -> bytes:
+    """Packs the KEK originator for a SID protection descriptor.
+
+    The originator is the only part of the KEK recipient info derived from the
+    protection descriptor. It is cached as the same descriptor is typically
+    used for many blobs.
+
+    Args:
+        protection_descriptor: The SID the blob is protected with.
+
+    Returns:
+        bytes: The DER encoded originator sequence.
+    """
+    writer = ASN1Writer()
+    with writer.push_sequence() as originator:
+        originator.write_raw_object_identifier(DPAPINGBlob._MICROSOFT_SOFTWARE_OID_ENCODED)
+        with originator.push_sequence() as originator_sequence:
+            originator_sequence.write_raw_object_identifier(DPAPINGBlob._MICROSOFT_SOFTWARE_SYSTEMS_OID_ENCODED)
+            with originator_sequence.push_sequence() as originator_sequence_2:
+                with originator_sequence_2.push_sequence() as originator_sequence_3:
+                    with originator_sequence_3.push_sequence() as originator_sequence_4:
+                        originator_sequence_4.write_octet_string(
+                            b"SID", ASN1Tag.universal_tag(TypeTagNumber.UTF8_STRING)
+                        )
+                        originator_sequence_4.write_octet_string(
+                            protection_descriptor.encode("utf-8"),
+                            ASN1Tag.universal_tag(TypeTagNumber.UTF8_STRING),
+                        )
+
+    return bytes(writer.get_data())
@@ -3,10 +3,19 @@
 
 from __future__ import annotations
 
+import asyncio
+import base64
+import collections
+import functools
+import json
+import os
+import threading
 import time
 import typing as t
 import uuid
 
+from cryptography.hazmat.primitives import hashes
+
 from ._asn1 import ASN1Writer
 from ._blob import DPAPINGBlob
 from ._crypto import (
@@ -31,21 +40,74 @@ from ._gkdi import (
 from ._rpc import (
     NDR,
     NDR64,
+    AsyncRpcClient,
     BindAck,
     CommandFlags,
     CommandPContext,
     ContextElement,
     ContextResultCode,
     Response,
+    SyncRpcClient,
     VerificationTrailer,
     async_create_rpc_connection,
     bind_time_feature_negotiation,
     create_rpc_connection,
 )
-from ._security_descriptor import ace_to_bytes, sd_to_bytes
+from ._security_descriptor import protection_sd_to_bytes
 
 _EPOCH_FILETIME = 116444736000000000  # 1970-01-01 as FILETIME
 
+# The number of FILETIME intervals covered by each L0, L1, and L2 index.
+_L2_DIV = 360000000000  # 3.6 * 10**11
+_L1_DIV = 32 * _L2_DIV
+_L0_DIV = 32 * _L1_DIV
+
+# The same values in nanoseconds so the indexes can be computed straight from
+# time.time_ns().
+_EPOCH_FILETIME_NS = _EPOCH_FILETIME * 100
+_L2_NS = _L2_DIV * 100
+_L1_NS = _L1_DIV * 100
+_L0_NS = _L0_DIV * 100
+
+_DEFAULT_KDF_PARAMETERS = KDFParameters("SHA512").pack()
+
+# RFC 5114 - 2.3. 2048-bit MODP Group with 256-bit Prime Order Subgroup
+# https://www.rfc-editor.org/rfc/rfc5114#section-2.3
+_DEFAULT_DH_PARAMETERS = FFCDHParameters(
+    key_length=256,
+    field_order=17125458317614137930196041979257577826408832324037508573393292981642667139747621778802438775238728592968344613589379932348475613503476932163166973813218698343816463289144185362912602522540494983090531497232965829536524507269848825658311420299335922295709743267508322525966773950394919257576842038771632742044142471053509850123605883815857162666917775193496157372656195558305727009891276006514000409365877218171388319923896309377791762590614311849642961380224851940460421710449368927252974870395873936387909672274883295377481008150475878590270591798350563488168080923804611822387520198054002990623911454389104774092183,
+    generator=8041367327046189302693984665026706374844608289874374425728797669509435881459140662650215832833471328470334064628508692231999401840332046192569287351991689963279656892562484773278584208040987631569628520464069532361274047374444344996651832979378318849943741662110395995778429270819222431610927356005913836932462099770076239554042855287138026806960470277326229482818003962004453764400995790974042663675692120758726145869061236443893509136147942414445551848162391468541444355707785697825741856849161233887307017428371823608125699892904960841221593344499088996021883972185241854777608212592397013510086894908468466292313,
+).pack()
+
+# How long, in seconds, the ISD_KEY port returned by the endpoint mapper is
+# reused before it is looked up again.
+_ISD_KEY_PORT_TTL = 3600
+
+# The number of unwrapped CEKs kept by each KeyCache.
+_CEK_CACHE_SIZE = 128
+
+# How long, in seconds, a pooled connection can be idle before it is closed
+# rather than reused.
+_RPC_IDLE_TIMEOUT = 60
+
+# How long, in seconds, to wait for a response on an ISD_KEY connection. A
+# pooled connection dropped by a firewall would otherwise block forever.
+_RPC_READ_TIMEOUT = 30
+
+# The errors raised by a request on a pooled connection that was closed or
+# dropped while it was idle.
+_STALE_CONNECTION_ERRORS = (OSError, EOFError, asyncio.TimeoutError)
+
+# server, username, password, auth_protocol
+_RpcPoolKey = t.Tuple[str, t.Optional[str], t.Optional[str], str]
+_RpcClientT = t.TypeVar("_RpcClientT", SyncRpcClient, AsyncRpcClient)
+
+# root_key_id, target_sd, l0, l1, l2, server, username, password, auth_protocol
+_InflightKey = t.Tuple[uuid.UUID, bytes, int, int, int, t.Optional[str], t.Optional[str], t.Optional[str], str]
+
+# domain_name, root_key_id, target_sd, l0
+_BatchKey = t.Tuple[str, uuid.UUID, bytes, int]
+
 _EPM_CONTEXTS = [
     ContextElement(
         context_id=0,
@@ -78,7 +140,9 @@ _EPT_MAP_ISD_KEY = EptMap(
     entry_handle=None,
     max_towers=4,
 )
+_EPT_MAP_ISD_KEY_DATA = _EPT_MAP_ISD_KEY.pack()
 
+# Packed once as it is the same for every GetKey request.
 _VERIFICATION_TRAILER = VerificationTrailer(
     [
         CommandPContext(
@@ -87,7 +151,7 @@ _VERIFICATION_TRAILER = VerificationTrailer(
             transfer_syntax=NDR64,
         ),
     ]
-)
+).pack()
 
 
 def _process_bind_result(
@@ -128,107 +192,400 @@ def _process_get_key_result(
     pad_length = len(response.stub_data)
     if response.sec_trailer and response.sec_trailer.pad_length:
         pad_length -= response.sec_trailer.pad_length
-    raw_resp = response.stub_data[:pad_length]
+    raw_resp = memoryview(response.stub_data)[:pad_length]
     return GetKey.unpack_response(raw_resp)
 
 
-async def _async_get_key(
+class _RpcPool:
+    """Pool of bound ISD_KEY RPC connections.
+
+    Stores the ISD_KEY port returned by the endpoint mapper for each server and
+    keeps the connections used for GetKey open once the call is done. Later
+    calls to the same server with the same credentials reuse an idle
+    connection rather than connecting and binding again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # server: (port, time.monotonic() expiry)
+        self._isd_key_ports: t.Dict[str, t.Tuple[int, float]] = {}
+        # Idle connections with the time.monotonic() value they were released.
+        self._sync_idle: t.Dict[_RpcPoolKey, t.List[t.Tuple[SyncRpcClient, float]]] = {}
+        # Async connections are tied to the event loop they were created on so
+        # they are kept per loop.
+        self._async_idle: t.Dict[
+            t.Tuple[asyncio.AbstractEventLoop, _RpcPoolKey],
+            t.List[t.Tuple[AsyncRpcClient, float]],
+        ] = {}
+
+    def get_isd_key_port(
+        self,
+        server: str,
+    ) -> t.Optional[int]:
+        port, expiry = self._isd_key_ports.get(server, (None, 0.0))
+        if port is None or expiry <= time.monotonic():
+            return None
+
+        return port
+
+    def set_isd_key_port(
+        self,
+        server: str,
+        port: int,
+    ) -> None:
+        self._isd_key_ports[server] = (port, time.monotonic() + _ISD_KEY_PORT_TTL)
+
+    def remove_isd_key_port(
+        self,
+        server: str,
+    ) -> None:
+        self._isd_key_ports.pop(server, None)
+
+    def acquire_sync(
+        self,
+        key: _RpcPoolKey,
+    ) -> t.Optional[SyncRpcClient]:
+        with self._lock:
+            rpc, expired = _pop_idle_connection(self._sync_idle.get(key, []))
+
+        for expired_rpc in expired:
+            _sync_close_quietly(expired_rpc)
+
+        return rpc
+
+    def release_sync(
+        self,
+        key: _RpcPoolKey,
+        rpc: SyncRpcClient,
+    ) -> None:
+        with self._lock:
+            self._sync_idle.setdefault(key, []).append((rpc, time.monotonic()))
+
+    async def acquire_async(
+        self,
+        key: _RpcPoolKey,
+    ) -> t.Optional[AsyncRpcClient]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Connections from a loop that has since been closed, like a
+            # previous asyncio.run call, can no longer be used.
+            for idle_key in [k for k in self._async_idle if k[0].is_closed()]:
+                del self._async_idle[idle_key]
+
+            rpc, expired = _pop_idle_connection(self._async_idle.get((loop, key), []))
+
+        for expired_rpc in expired:
+            await _async_close_quietly(expired_rpc)
+
+        return rpc
+
+    def release_async(
+        self,
+        key: _RpcPoolKey,
+        rpc: AsyncRpcClient,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._async_idle.setdefault((loop, key), []).append((rpc, time.monotonic()))
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [rpc for connections in self._sync_idle.values() for rpc, _ in connections]
+            self._sync_idle = {}
+
+        for rpc in idle:
+            rpc.close()
+
+    async def async_close(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            idle = [
+                (idle_loop, rpc) for (idle_loop, _), connections in self._async_idle.items() for rpc, _ in connections
+            ]
+            self._async_idle = {}
+
+        for idle_loop, rpc in idle:
+            if idle_loop is loop:
+                await _async_close_quietly(rpc)
+            elif not idle_loop.is_closed():
+                asyncio.run_coroutine_threadsafe(_async_close_quietly(rpc), idle_loop)
+
+
+def _pop_idle_connection(
+    idle: t.List[t.Tuple[_RpcClientT, float]],
+) -> t.Tuple[t.Optional[_RpcClientT], t.List[_RpcClientT]]:
+    # Connections are appended as they are released so any that have been
+    # idle for too long are at the start of the list.
+    cutoff = time.monotonic() - _RPC_IDLE_TIMEOUT
+    expired_count = 0
+    while expired_count < len(idle) and idle[expired_count][1] <= cutoff:
+        expired_count += 1
+
+    expired = [rpc for rpc, _ in idle[:expired_count]]
+    del idle[:expired_count]
+
+    return (idle.pop()[0] if idle else None), expired
+
+
+async def _async_close_quietly(
+    rpc: AsyncRpcClient,
+) -> None:
+    # A pooled connection may have already been closed by the server or
+    # belong to an event loop that is no longer running.
+    try:
+        await rpc.close()
+    except Exception:
+        pass
+
+
+def _sync_close_quietly(
+    rpc: SyncRpcClient,
+) -> None:
+    try:
+        rpc.close()
+    except Exception:
+        pass
+
+
+async def _async_connect_isd_key(
     server: str,
-    target_sd: bytes,
-    root_key_id: t.Optional[uuid.UUID],
-    l0: int = -1,
-    l1: int = -1,
-    l2: int = -1,
-    username: t.Optional[str] = None,
-    password: t.Optional[str] = None,
-    auth_protocol: str = "negotiate",
-) -> GroupKeyEnvelope:
+    username: t.Optional[str],
+    password: t.Optional[str],
+    auth_protocol: str,
+    pool: t.Optional[_RpcPool],
+) -> AsyncRpcClient:
+    isd_key_port = pool.get_isd_key_port(server) if pool else None
+    if pool and isd_key_port is not None:
+        try:
+            return await _async_bind_isd_key(server, isd_key_port, username, password, auth_protocol)
+        except (OSError, asyncio.TimeoutError):
+            # The DC may have been restarted and is now listening on a
+            # different port, look it up again.
+            pool.remove_isd_key_port(server)
+
     rpc = await async_create_rpc_connection(server)
     async with rpc:
         context_id = _EPM_CONTEXTS[0].context_id
         ack = await rpc.bind(contexts=_EPM_CONTEXTS)
         _process_bind_result(_EPM_CONTEXTS, ack, context_id)
 
-        ept_map = _EPT_MAP_ISD_KEY
-        resp = await rpc.request(context_id, ept_map.opnum, ept_map.pack())
+        resp = await rpc.request(context_id, _EPT_MAP_ISD_KEY.opnum, _EPT_MAP_ISD_KEY_DATA)
         isd_key_port = _process_ept_map_result(resp)
 
+    if pool:
+        pool.set_isd_key_port(server, isd_key_port)
+
+    return await _async_bind_isd_key(server, isd_key_port, username, password, auth_protocol)
+
+
+async def _async_bind_isd_key(
+    server: str,
+    port: int,
+    username: t.Optional[str],
+    password: t.Optional[str],
+    auth_protocol: str,
+) -> AsyncRpcClient:
     rpc = await async_create_rpc_connection(
         server,
-        isd_key_port,
+        port,
         username=username,
         password=password,
         auth_protocol=auth_protocol,
+        read_timeout=_RPC_READ_TIMEOUT,
     )
-    async with rpc:
+    try:
         context_id = _ISD_KEY_CONTEXTS[0].context_id
         ack = await rpc.bind(contexts=_ISD_KEY_CONTEXTS)
         _process_bind_result(_ISD_KEY_CONTEXTS, ack, context_id)
+    except BaseException:
+        await rpc.close()
+        raise
 
-        get_key = GetKey(target_sd, root_key_id, l0, l1, l2)
-        resp = await rpc.request(
-            context_id,
-            get_key.opnum,
-            get_key.pack(),
-            verification_trailer=_VERIFICATION_TRAILER,
-        )
-        return _process_get_key_result(resp)
+    return rpc
 
 
-def _sync_get_key(
+def _sync_connect_isd_key(
     server: str,
-    target_sd: bytes,
-    root_key_id: t.Optional[uuid.UUID] = None,
-    l0: int = -1,
-    l1: int = -1,
-    l2: int = -1,
-    username: t.Optional[str] = None,
-    password: t.Optional[str] = None,
-    auth_protocol: str = "negotiate",
-) -> GroupKeyEnvelope:
+    username: t.Optional[str],
+    password: t.Optional[str],
+    auth_protocol: str,
+    pool: t.Optional[_RpcPool],
+) -> SyncRpcClient:
+    isd_key_port = pool.get_isd_key_port(server) if pool else None
+    if pool and isd_key_port is not None:
+        try:
+            return _sync_bind_isd_key(server, isd_key_port, username, password, auth_protocol)
+        except OSError:
+            # The DC may have been restarted and is now listening on a
+            # different port, look it up again.
+            pool.remove_isd_key_port(server)
+
     with create_rpc_connection(server) as rpc:
         context_id = _EPM_CONTEXTS[0].context_id
         ack = rpc.bind(contexts=_EPM_CONTEXTS)
         _process_bind_result(_EPM_CONTEXTS, ack, context_id)
 
-        ept_map = _EPT_MAP_ISD_KEY
-        resp = rpc.request(0, ept_map.opnum, ept_map.pack())
+        resp = rpc.request(0, _EPT_MAP_ISD_KEY.opnum, _EPT_MAP_ISD_KEY_DATA)
         isd_key_port = _process_ept_map_result(resp)
 
-    with create_rpc_connection(
+    if pool:
+        pool.set_isd_key_port(server, isd_key_port)
+
+    return _sync_bind_isd_key(server, isd_key_port, username, password, auth_protocol)
+
+
+def _sync_bind_isd_key(
+    server: str,
+    port: int,
+    username: t.Optional[str],
+    password: t.Optional[str],
+    auth_protocol: str,
+) -> SyncRpcClient:
+    rpc = create_rpc_connection(
         server,
-        isd_key_port,
+        port,
         username=username,
         password=password,
         auth_protocol=auth_protocol,
-    ) as rpc:
+        read_timeout=_RPC_READ_TIMEOUT,
+    )
+    try:
         context_id = _ISD_KEY_CONTEXTS[0].context_id
         ack = rpc.bind(contexts=_ISD_KEY_CONTEXTS)
         _process_bind_result(_ISD_KEY_CONTEXTS, ack, context_id)
+    except BaseException:
+        rpc.close()
+        raise
 
-        get_key = GetKey(target_sd, root_key_id, l0, l1, l2)
-        resp = rpc.request(
-            context_id,
-            get_key.opnum,
-            get_key.pack(),
-            verification_trailer=_VERIFICATION_TRAILER,
-        )
-        return _process_get_key_result(resp)
+    return rpc
+
+
+async def _async_get_key(
+    server: str,
+    target_sd: bytes,
+    root_key_id: t.Optional[uuid.UUID],
+    l0: int = -1,
+    l1: int = -1,
+    l2: int = -1,
+    username: t.Optional[str] = None,
+    password: t.Optional[str] = None,
+    auth_protocol: str = "negotiate",
+    pool: t.Optional[_RpcPool] = None,
+) -> GroupKeyEnvelope:
+    get_key = GetKey(target_sd, root_key_id, l0, l1, l2)
+    pool_key = (server, username, password, auth_protocol)
+
+    rpc = await pool.acquire_async(pool_key) if pool else None
+    if rpc:
+        try:
+            resp = await rpc.request(
+                _ISD_KEY_CONTEXTS[0].context_id,
+                get_key.opnum,
+                get_key.pack(),
+                verification_trailer=_VERIFICATION_TRAILER,
+            )
+        except _STALE_CONNECTION_ERRORS:
+            # The server may have dropped the idle connection, try again with
+            # a new one.
+            await _async_close_quietly(rpc)
+            rpc = None
+        except BaseException:
+            await _async_close_quietly(rpc)
+            raise
+
+    if not rpc:
+        rpc = await _async_connect_isd_key(server, username, password, auth_protocol, pool)
+        try:
+            resp = await rpc.request(
+                _ISD_KEY_CONTEXTS[0].context_id,
+                get_key.opnum,
+                get_key.pack(),
+                verification_trailer=_VERIFICATION_TRAILER,
+            )
+        except BaseException:
+            await rpc.close()
+            raise
+
+    if pool:
+        pool.release_async(pool_key, rpc)
+    else:
+        await rpc.close()
+
+    return _process_get_key_result(resp)
+
+
+def _sync_get_key(
+    server: str,
+    target_sd: bytes,
+    root_key_id: t.Optional[uuid.UUID] = None,
+    l0: int = -1,
+    l1: int = -1,
+    l2: int = -1,
+    username: t.Optional[str] = None,
+    password: t.Optional[str] = None,
+    auth_protocol: str = "negotiate",
+    pool: t.Optional[_RpcPool] = None,
+) -> GroupKeyEnvelope:
+    get_key = GetKey(target_sd, root_key_id, l0, l1, l2)
+    pool_key = (server, username, password, auth_protocol)
+
+    rpc = pool.acquire_sync(pool_key) if pool else None
+    if rpc:
+        try:
+            resp = rpc.request(
+                _ISD_KEY_CONTEXTS[0].context_id,
+                get_key.opnum,
+                get_key.pack(),
+                verification_trailer=_VERIFICATION_TRAILER,
+            )
+        except _STALE_CONNECTION_ERRORS:
+            # The server may have dropped the idle connection, try again with
+            # a new one.
+            _sync_close_quietly(rpc)
+            rpc = None
+        except BaseException:
+            _sync_close_quietly(rpc)
+            raise
+
+    if not rpc:
+        rpc = _sync_connect_isd_key(server, username, password, auth_protocol, pool)
+        try:
+            resp = rpc.request(
+                _ISD_KEY_CONTEXTS[0].context_id,
+                get_key.opnum,
+                get_key.pack(),
+                verification_trailer=_VERIFICATION_TRAILER,
+            )
+        except BaseException:
+            rpc.close()
+            raise
+
+    if pool:
+        pool.release_sync(pool_key, rpc)
+    else:
+        rpc.close()
+
+    return _process_get_key_result(resp)
 
 
 def _decrypt_blob(
     blob: DPAPINGBlob,
     key: GroupKeyEnvelope,
+    cache: t.Optional[KeyCache] = None,
 ) -> bytes:
-    kek = key.get_kek(blob.key_identifier)
-
-    # With the kek we can unwrap the encrypted cek in the LAPS payload.
-    cek = cek_decrypt(
-        blob.enc_cek_algorithm,
-        blob.enc_cek_parameters,
-        kek,
-        blob.enc_cek,
-    )
+    cek = cache._get_cek(blob) if cache else None
+    if cek is None:
+        kek = key.get_kek(blob.key_identifier)
+
+        # With the kek we can unwrap the encrypted cek in the LAPS payload.
+        cek = cek_decrypt(
+            blob.enc_cek_algorithm,
+            blob.enc_cek_parameters,
+            kek,
+            blob.enc_cek,
+        )
+        if cache:
+            cache._store_cek(blob, cek)
 
     # With the cek we can decrypt the encrypted content in the LAPS payload.
     return content_decrypt(
@@ -242,7 +599,6 @@ def _decrypt_blob(
 def _encrypt_blob(
     blob: bytes,
     key: GroupKeyEnvelope,
-    security_descriptor: bytes,
     protection_descriptor: str,
 ) -> bytes:
     # Generate cek and encrypt our payload.
@@ -274,14 +630,14 @@ def _encrypt_blob(
 
     return DPAPINGBlob(
         key_identifier=key_identifier,
-        security_descriptor=security_descriptor,
+        protection_descriptor=protection_descriptor,
         enc_cek=enc_cek,
         enc_cek_algorithm=enc_cek_algorithm,
         enc_cek_parameters=enc_cek_parameters,
         enc_content=enc_content,
         enc_content_algorithm=enc_content_algorithm,
         enc_content_parameters=enc_content_parameters,
-    ).pack(protection_descriptor)
+    ).pack()
 
 
 def _get_protection_gke_from_cache(
@@ -295,11 +651,9 @@ def _get_protection_gke_from_cache(
     # MS-GKDI 3.1.4.1 GetKey rules on how to generate the group key identifier
     # values from the current time
     # https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-gkdi/4cac87a3-521e-4918-a272-240f8fabed39
-    current_time = (time.time_ns() // 100) + _EPOCH_FILETIME
-    base = 360000000000  # 3.6 * 10**11
-    l0 = int(current_time / (32 * 32 * base))
-    l1 = int((current_time % (32 * 32 * base)) / (32 * base))
-    l2 = int((current_time % (32 * base)) / base)
+    l0, remainder = divmod(time.time_ns() + _EPOCH_FILETIME_NS, _L0_NS)
+    l1, remainder = divmod(remainder, _L1_NS)
+    l2 = remainder // _L2_NS
 
     rk = cache._get_key(
         target_sd,
@@ -311,9 +665,8 @@ def _get_protection_gke_from_cache(
     if not rk:
         return None
 
-    kdf_parameters = KDFParameters.unpack(rk.kdf_parameters)
     l2_key = compute_l2_key(
-        kdf_parameters.hash_algorithm,
+        _get_kdf_hash_algorithm(rk.kdf_parameters),
         l1,
         l2,
         rk,
@@ -339,6 +692,59 @@ def _get_protection_gke_from_cache(
     )
 
 
+def _get_batch_keys(
+    blobs: t.List[DPAPINGBlob],
+    cache: KeyCache,
+) -> t.Tuple[t.List[t.Optional[GroupKeyEnvelope]], t.Dict[_BatchKey, DPAPINGBlob]]:
+    """Get the cached keys for a batch of blobs.
+
+    Returns the cached key for each blob, or None if it needs to be retrieved,
+    and the blobs to request the missing keys with. Blobs that share the same
+    domain, root key, target SD, and L0 index only need the one GetKey call
+    for the blob with the highest L1 and L2 index as the key returned can be
+    used to derive the keys for the others.
+    """
+    keys: t.List[t.Optional[GroupKeyEnvelope]] = []
+    requests: t.Dict[_BatchKey, DPAPINGBlob] = {}
+    for blob in blobs:
+        key_id = blob.key_identifier
+        rk = cache._get_key(
+            blob.security_descriptor,
+            key_id.root_key_identifier,
+            key_id.l0,
+            key_id.l1,
+            key_id.l2,
+        )
+        keys.append(rk)
+        if rk:
+            continue
+
+        batch_key = _get_batch_key(blob)
+        existing = requests.get(batch_key, None)
+        if (
+            not existing
+            or key_id.l1 > existing.key_identifier.l1
+            or (key_id.l1 == existing.key_identifier.l1 and key_id.l2 > existing.key_identifier.l2)
+        ):
+            requests[batch_key] = blob
+
+    return keys, requests
+
+
+def _get_batch_key(
+    blob: DPAPINGBlob,
+) -> _BatchKey:
+    key_id = blob.key_identifier
+    return key_id.domain_name, key_id.root_key_identifier, blob.security_descriptor, key_id.l0
+
+
+@functools.lru_cache(maxsize=32)
+def _get_kdf_hash_algorithm(
+    kdf_parameters: bytes,
+) -> hashes.HashAlgorithm:
+    return KDFParameters.unpack(kdf_parameters).hash_algorithm
+
+
 class RootKey(t.NamedTuple):
     """The KDS Root Key."""
 
@@ -350,6 +756,7 @@ class RootKey(t.NamedTuple):
     secret_parameters: t.Optional[bytes]
     private_key_length: int
     public_key_length: int
+    hash_algorithm: hashes.HashAlgorithm  # Parsed from kdf_parameters
 
 
 class KeyCache:
@@ -358,11 +765,70 @@ class KeyCache:
     This is a cache used to store the KDS keys. It can be used with
     :meth:`async_ncrypt_unprotect_secret` and :meth:`ncrypt_unprotect_secret`
     to avoid any extra RPC calls if the data was already retrieved.
+
+    The cache also keeps the RPC connections used to retrieve the keys open so
+    they can be reused by later calls to the same server. Idle connections are
+    closed after a minute rather than being reused. Call :meth:`close`, or
+    :meth:`async_close` when used with the async functions, once the cache is
+    no longer needed to close these connections. The cache can also be used as
+    a context manager, or async context manager, to do this automatically.
     """
 
     def __init__(self) -> None:
         self._root_keys: t.Dict[uuid.UUID, RootKey] = {}
-        self._seed_keys: t.Dict[uuid.UUID, t.Dict[bytes, t.Dict[int, GroupKeyEnvelope]]] = {}
+        self._seed_keys: t.Dict[t.Tuple[uuid.UUID, bytes, int], GroupKeyEnvelope] = {}
+        self._lock = threading.Lock()
+        # Most recently unwrapped CEKs so decrypting the same blob again can
+        # skip deriving the KEK.
+        self._ceks: collections.OrderedDict[t.Tuple[bytes, bytes, bytes], bytes] = collections.OrderedDict()
+        self._rpc_pool = _RpcPool()
+        # Pending async GetKey requests so concurrent callers for the same key
+        # share the one RPC call.
+        self._inflight: t.Dict[_InflightKey, asyncio.Future[GroupKeyEnvelope]] = {}
+
+    def close(self) -> None:
+        """Close the RPC connections kept by the cache.
+
+        Closes any connections opened by :meth:`ncrypt_unprotect_secret` and
+        :meth:`ncrypt_protect_secret`. The cached keys are kept and the cache
+        can still be used afterwards.
+        """
+        self._rpc_pool.close()
+
+    async def async_close(self) -> None:
+        """Close the async RPC connections kept by the cache.
+
+        Closes any connections opened by :meth:`async_ncrypt_unprotect_secret`
+        and :meth:`async_ncrypt_protect_secret`. The cached keys are kept and
+        the cache can still be used afterwards.
+        """
+        await self._rpc_pool.async_close()
+
+    def __enter__(self) -> KeyCache:
+        return self
+
+    def __exit__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> KeyCache:
+        return self
+
+    async def __aexit__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        await self.async_close()
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        # Only the keys are pickled, the lock and RPC connections are specific
+        # to this process and are created again when unpickled.
+        with self._lock:
+            return {
+                "_root_keys": dict(self._root_keys),
+                "_seed_keys": dict(self._seed_keys),
+            }
+
+    def __setstate__(self, state: t.Dict[str, t.Any]) -> None:
+        KeyCache.__init__(self)
+        self._root_keys.update(state["_root_keys"])
+        self._seed_keys.update(state["_seed_keys"])
 
     def load_key(
         self,
@@ -450,18 +916,12 @@ class KeyCache:
                 ``msKds-PublicKeyLength``.
         """
         if not kdf_parameters:
-            kdf_parameters = KDFParameters("SHA512").pack()
+            kdf_parameters = _DEFAULT_KDF_PARAMETERS
 
         if secret_algorithm == "DH" and not secret_parameters:
-            # RFC 5114 - 2.3. 2048-bit MODP Group with 256-bit Prime Order Subgroup
-            # https://www.rfc-editor.org/rfc/rfc5114#section-2.3
-            secret_parameters = FFCDHParameters(
-                key_length=256,
-                field_order=17125458317614137930196041979257577826408832324037508573393292981642667139747621778802438775238728592968344613589379932348475613503476932163166973813218698343816463289144185362912602522540494983090531497232965829536524507269848825658311420299335922295709743267508322525966773950394919257576842038771632742044142471053509850123605883815857162666917775193496157372656195558305727009891276006514000409365877218171388319923896309377791762590614311849642961380224851940460421710449368927252974870395873936387909672274883295377481008150475878590270591798350563488168080923804611822387520198054002990623911454389104774092183,
-                generator=8041367327046189302693984665026706374844608289874374425728797669509435881459140662650215832833471328470334064628508692231999401840332046192569287351991689963279656892562484773278584208040987631569628520464069532361274047374444344996651832979378318849943741662110395995778429270819222431610927356005913836932462099770076239554042855287138026806960470277326229482818003962004453764400995790974042663675692120758726145869061236443893509136147942414445551848162391468541444355707785697825741856849161233887307017428371823608125699892904960841221593344499088996021883972185241854777608212592397013510086894908468466292313,
-            ).pack()
-
-        self._root_keys[root_key_id] = RootKey(
+            secret_parameters = _DEFAULT_DH_PARAMETERS
+
+        root_key = RootKey(
             key=key,
             version=version,
             kdf_algorithm=kdf_algorithm,
@@ -470,7 +930,149 @@ class KeyCache:
             secret_parameters=secret_parameters,
             private_key_length=private_key_length,
             public_key_length=public_key_length,
+            hash_algorithm=KDFParameters.unpack(kdf_parameters).hash_algorithm,
         )
+        with self._lock:
+            self._root_keys[root_key_id] = root_key
+
+    def save(
+        self,
+        path: str,
+    ) -> None:
+        """Save the cached keys to a file.
+
+        Saves the root keys loaded with :meth:`load_key` and the seed keys
+        retrieved or derived so far to a file. The file can be loaded with
+        :meth:`load` by a later process to avoid retrieving the keys again.
+
+        The file contains the key material in plaintext, anyone who can read it
+        can decrypt the secrets the keys protect. It is created so only the
+        current user can read it, if the file already exists its permissions
+        are left as is.
+
+        Args:
+            path: The path to save the keys to.
+        """
+        with self._lock:
+            root_keys = list(self._root_keys.items())
+            seed_keys = list(self._seed_keys.items())
+
+        data = {
+            "version": 1,
+            "root_keys": [
+                {
+                    "root_key_id": str(root_key_id),
+                    "key": base64.b64encode(root_key.key).decode(),
+                    "version": root_key.version,
+                    "kdf_algorithm": root_key.kdf_algorithm,
+                    "kdf_parameters": base64.b64encode(root_key.kdf_parameters).decode(),
+                    "secret_algorithm": root_key.secret_algorithm,
+                    "secret_parameters": (
+                        base64.b64encode(root_key.secret_parameters).decode()
+                        if root_key.secret_parameters is not None
+                        else None
+                    ),
+                    "private_key_length": root_key.private_key_length,
+                    "public_key_length": root_key.public_key_length,
+                }
+                for root_key_id, root_key in root_keys
+            ],
+            "seed_keys": [
+                {
+                    "target_sd": base64.b64encode(target_sd).decode(),
+                    "key": base64.b64encode(seed_key.pack()).decode(),
+                }
+                for (_, target_sd, _), seed_key in seed_keys
+            ],
+        }
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            fd_writer = open(fd, mode="w", encoding="utf-8")
+        except BaseException:
+            os.close(fd)
+            raise
+
+        with fd_writer:
+            json.dump(data, fd_writer)
+
+    def load(
+        self,
+        path: str,
+    ) -> None:
+        """Load the keys from a file.
+
+        Loads the keys saved with :meth:`save` into the cache. Keys already in
+        the cache are kept.
+
+        Args:
+            path: The path to load the keys from.
+
+        Raises:
+            ValueError: The file is not a supported key cache file.
+        """
+        with open(path, mode="r", encoding="utf-8") as fd:
+            data = json.load(fd)
+
+        if data.get("version", None) != 1:
+            raise ValueError(f"Unknown key cache file version {data.get('version', None)}")
+
+        for root_key in data["root_keys"]:
+            self.load_key(
+                key=base64.b64decode(root_key["key"]),
+                root_key_id=uuid.UUID(root_key["root_key_id"]),
+                version=root_key["version"],
+                kdf_algorithm=root_key["kdf_algorithm"],
+                kdf_parameters=base64.b64decode(root_key["kdf_parameters"]),
+                secret_algorithm=root_key["secret_algorithm"],
+                secret_parameters=(
+                    base64.b64decode(root_key["secret_parameters"])
+                    if root_key["secret_parameters"] is not None
+                    else None
+                ),
+                private_key_length=root_key["private_key_length"],
+                public_key_length=root_key["public_key_length"],
+            )
+
+        for seed_key in data["seed_keys"]:
+            self._store_key(
+                base64.b64decode(seed_key["target_sd"]),
+                GroupKeyEnvelope.unpack(base64.b64decode(seed_key["key"])),
+            )
+
+    def prewarm(
+        self,
+        root_key_id: uuid.UUID,
+        protection_descriptor: str,
+        l0_indexes: t.Optional[t.Iterable[int]] = None,
+    ) -> None:
+        """Derive the seed keys for a loaded root key ahead of time.
+
+        Derives and caches the L1 seed keys for the protection descriptor and
+        L0 indexes specified so later operations using this cache do not need
+        to derive them. The root key must have been loaded with
+        :meth:`load_key`.
+
+        Args:
+            root_key_id: The root key id to derive the keys from.
+            protection_descriptor: The protection descriptor SID the keys are
+                for.
+            l0_indexes: The L0 indexes to derive the keys for, defaults to the
+                current and previous L0 index.
+
+        Raises:
+            ValueError: The root key has not been loaded.
+        """
+        if root_key_id not in self._root_keys:
+            raise ValueError(f"Root key {root_key_id} has not been loaded into the cache")
+
+        if l0_indexes is None:
+            l0 = (time.time_ns() + _EPOCH_FILETIME_NS) // _L0_NS
+            l0_indexes = [l0 - 1, l0]
+
+        target_sd = protection_sd_to_bytes(protection_descriptor)
+        for l0 in l0_indexes:
+            self._get_key(target_sd, root_key_id, l0, 31, 31)
 
     def _get_key(
         self,
@@ -496,52 +1098,97 @@ class KeyCache:
         Returns:
             Optional[GroupKeyEnvelope]: The cached key if one was available.
         """
-        seed_key = self._seed_keys.setdefault(root_key_id, {}).setdefault(target_sd, {}).get(l0, None)
+        # Held while deriving so concurrent callers don't derive the same key.
+        with self._lock:
+            seed_key = self._peek_key(target_sd, root_key_id, l0, l1, l2)
+            if seed_key:
+                return seed_key
+
+            root_key = self._root_keys.get(root_key_id, None)
+            if root_key:
+                l1_seed = compute_l1_key(
+                    target_sd,
+                    root_key_id,
+                    l0,
+                    root_key.key,
+                    root_key.hash_algorithm,
+                )
+
+                gke = GroupKeyEnvelope(
+                    version=root_key.version,
+                    flags=2,
+                    l0=l0,
+                    l1=31,
+                    l2=31,
+                    root_key_identifier=root_key_id,
+                    kdf_algorithm=root_key.kdf_algorithm,
+                    kdf_parameters=root_key.kdf_parameters,
+                    secret_algorithm=root_key.secret_algorithm,
+                    secret_parameters=root_key.secret_parameters or b"",
+                    private_key_length=root_key.private_key_length,
+                    public_key_length=root_key.public_key_length,
+                    domain_name="",
+                    forest_name="",
+                    l1_key=l1_seed,
+                    l2_key=b"",
+                )
+                return self._seed_keys.setdefault((root_key_id, target_sd, l0), gke)
+
+            return None
+
+    def _peek_key(
+        self,
+        target_sd: bytes,
+        root_key_id: uuid.UUID,
+        l0: int,
+        l1: int,
+        l2: int,
+    ) -> t.Optional[GroupKeyEnvelope]:
+        """Get a previously derived or retrieved key from the cache.
+
+        Like :meth:`_get_key` but will not derive a new L1 seed key from a
+        loaded root key if one has not already been cached.
+        """
+        seed_key = self._seed_keys.get((root_key_id, target_sd, l0), None)
         if seed_key and (seed_key.l1 > l1 or (seed_key.l1 == l1 and seed_key.l2 >= l2)):
             return seed_key
 
-        root_key = self._root_keys.get(root_key_id, None)
-        if root_key:
-            l1_seed = compute_l1_key(
-                target_sd,
-                root_key_id,
-                l0,
-                root_key.key,
-                KDFParameters.unpack(root_key.kdf_parameters).hash_algorithm,
-            )
+        return None
 
-            gke = GroupKeyEnvelope(
-                version=root_key.version,
-                flags=2,
-                l0=l0,
-                l1=31,
-                l2=31,
-                root_key_identifier=root_key_id,
-                kdf_algorithm=root_key.kdf_algorithm,
-                kdf_parameters=root_key.kdf_parameters,
-                secret_algorithm=root_key.secret_algorithm,
-                secret_parameters=root_key.secret_parameters or b"",
-                private_key_length=root_key.private_key_length,
-                public_key_length=root_key.public_key_length,
-                domain_name="",
-                forest_name="",
-                l1_key=l1_seed,
-                l2_key=b"",
-            )
-            return self._seed_keys.setdefault(root_key_id, {}).setdefault(target_sd, {}).setdefault(l0, gke)
+    def _get_cek(
+        self,
+        blob: DPAPINGBlob,
+    ) -> t.Optional[bytes]:
+        cek_key = (blob.key_identifier.pack(), blob.security_descriptor, blob.enc_cek)
+        with self._lock:
+            cek = self._ceks.get(cek_key, None)
+            if cek is not None:
+                self._ceks.move_to_end(cek_key)
 
-        return None
+            return cek
+
+    def _store_cek(
+        self,
+        blob: DPAPINGBlob,
+        cek: bytes,
+    ) -> None:
+        cek_key = (blob.key_identifier.pack(), blob.security_descriptor, blob.enc_cek)
+        with self._lock:
+            self._ceks[cek_key] = cek
+            if len(self._ceks) > _CEK_CACHE_SIZE:
+                self._ceks.popitem(last=False)
 
     def _store_key(
         self,
         target_sd: bytes,
         key: GroupKeyEnvelope,
     ) -> None:
-        seed_key = self._seed_keys.setdefault(key.root_key_identifier, {}).setdefault(target_sd, {})
+        cache_key = (key.root_key_identifier, target_sd, key.l0)
 
-        existing = seed_key.get(key.l0, None)
-        if not existing or key.l1 > existing.l1 or (key.l1 == existing.l1 and key.l2 > existing.l2):
-            seed_key[key.l0] = key
+        with self._lock:
+            existing = self._seed_keys.get(cache_key, None)
+            if not existing or key.l1 > existing.l1 or (key.l1 == existing.l1 and key.l2 > existing.l2):
+                self._seed_keys[cache_key] = key
 
 
 def ncrypt_unprotect_secret(
@@ -592,6 +1239,7 @@ def ncrypt_unprotect_secret(
     """
     blob = DPAPINGBlob.unpack(data)
 
+    rpc_pool = cache._rpc_pool if cache else None
     cache = cache or KeyCache()
     rk = cache._get_key(
         blob.security_descriptor,
@@ -616,12 +1264,85 @@ def ncrypt_unprotect_secret(
             username=username,
             password=password,
             auth_protocol=auth_protocol,
+            pool=rpc_pool,
         )
 
     if not rk.is_public_key:
         cache._store_key(blob.security_descriptor, rk)
 
-    return _decrypt_blob(blob, rk)
+    return _decrypt_blob(blob, rk, cache)
+
+
+def ncrypt_unprotect_secrets(
+    data: t.Iterable[bytes],
+    server: t.Optional[str] = None,
+    username: t.Optional[str] = None,
+    password: t.Optional[str] = None,
+    auth_protocol: str = "negotiate",
+    cache: t.Optional[KeyCache] = None,
+) -> t.List[bytes]:
+    """Decrypt multiple DPAPI-NG Blobs.
+
+    Decrypts each DPAPI-NG blob provided like :meth:`ncrypt_unprotect_secret`
+    but retrieves the keys for the whole batch together. Blobs protected by
+    the same key share the one GetKey call and all the calls to the same
+    domain controller are made over the same RPC connection.
+
+    Args:
+        data: The DPAPI-NG blobs to decrypt.
+        server: The domain controller to lookup the root key info.
+        username: The username to decrypt the DPAPI-NG blobs as.
+        password: The password for the user.
+        auth_protocol: The authentication protocol to use, defaults to
+            ``negotiate`` but can be ``kerberos`` or ``ntlm``.
+        cache: Optional cache that is used as the key source to avoid making
+            the RPC call.
+
+    Returns:
+        List[bytes]: The decrypted DPAPI-NG data in the same order as the
+        input blobs.
+
+    Raises:
+        ValueError: An invalid data structure was found.
+        NotImplementedError: An unknown value was found and has not been
+            implemented yet.
+    """
+    blobs = [DPAPINGBlob.unpack(b) for b in data]
+
+    batch_cache = cache or KeyCache()
+    try:
+        keys, requests = _get_batch_keys(blobs, batch_cache)
+
+        servers: t.Dict[str, str] = {}
+        retrieved: t.Dict[_BatchKey, GroupKeyEnvelope] = {}
+        for batch_key, blob in requests.items():
+            key_server = server
+            if not key_server:
+                domain_name = blob.key_identifier.domain_name
+                if domain_name not in servers:
+                    servers[domain_name] = lookup_dc(domain_name).target
+                key_server = servers[domain_name]
+
+            rk = _sync_get_key(
+                key_server,
+                blob.security_descriptor,
+                blob.key_identifier.root_key_identifier,
+                blob.key_identifier.l0,
+                blob.key_identifier.l1,
+                blob.key_identifier.l2,
+                username=username,
+                password=password,
+                auth_protocol=auth_protocol,
+                pool=batch_cache._rpc_pool,
+            )
+            if not rk.is_public_key:
+                batch_cache._store_key(blob.security_descriptor, rk)
+            retrieved[batch_key] = rk
+    finally:
+        if not cache:
+            batch_cache.close()
+
+    return [_decrypt_blob(blob, rk or retrieved[_get_batch_key(blob)], batch_cache) for blob, rk in zip(blobs, keys)]
 
 
 def ncrypt_protect_secret(
@@ -685,12 +1406,9 @@ def ncrypt_protect_secret(
     l1 = -1
     l2 = -1
 
-    sd = sd_to_bytes(
-        owner="S-1-5-18",
-        group="S-1-5-18",
-        dacl=[ace_to_bytes(protection_descriptor, 3), ace_to_bytes("S-1-1-0", 2)],
-    )
+    sd = protection_sd_to_bytes(protection_descriptor)
 
+    rpc_pool = cache._rpc_pool if cache else None
     cache = cache or KeyCache()
     rk = _get_protection_gke_from_cache(root_key_identifier, sd, cache)
 
@@ -709,12 +1427,13 @@ def ncrypt_protect_secret(
             username=username,
             password=password,
             auth_protocol=auth_protocol,
+            pool=rpc_pool,
         )
 
     if not rk.is_public_key:
         cache._store_key(sd, rk)
 
-    return _encrypt_blob(data, rk, sd, protection_descriptor)
+    return _encrypt_blob(data, rk, protection_descriptor)
 
 
 async def async_ncrypt_unprotect_secret(
@@ -765,6 +1484,7 @@ async def async_ncrypt_unprotect_secret(
     """
     blob = DPAPINGBlob.unpack(data)
 
+    rpc_pool = cache._rpc_pool if cache else None
     cache = cache or KeyCache()
     rk = cache._get_key(
         blob.security_descriptor,
@@ -774,26 +1494,140 @@ async def async_ncrypt_unprotect_secret(
         blob.key_identifier.l2,
     )
     if not rk:
-        if not server:
-            srv = await async_lookup_dc(blob.key_identifier.domain_name)
-            server = srv.target
-
-        rk = await _async_get_key(
-            server,
-            blob.security_descriptor,
+        inflight_key = (
             blob.key_identifier.root_key_identifier,
+            blob.security_descriptor,
             blob.key_identifier.l0,
             blob.key_identifier.l1,
             blob.key_identifier.l2,
-            username=username,
-            password=password,
-            auth_protocol=auth_protocol,
+            server,
+            username,
+            password,
+            auth_protocol,
         )
+        inflight = cache._inflight
+        request = inflight.get(inflight_key, None)
+        if request is None:
+            request = asyncio.ensure_future(
+                _async_get_key_for_blob(
+                    blob,
+                    server,
+                    username,
+                    password,
+                    auth_protocol,
+                    rpc_pool,
+                )
+            )
+            inflight[inflight_key] = request
+            request.add_done_callback(lambda _: inflight.pop(inflight_key, None))
+
+        # Shielded so a cancelled caller does not cancel the request for any
+        # other caller waiting on the same key.
+        rk = await asyncio.shield(request)
 
     if not rk.is_public_key:
         cache._store_key(blob.security_descriptor, rk)
 
-    return _decrypt_blob(blob, rk)
+    return _decrypt_blob(blob, rk, cache)
+
+
+async def _async_get_key_for_blob(
+    blob: DPAPINGBlob,
+    server: t.Optional[str],
+    username: t.Optional[str],
+    password: t.Optional[str],
+    auth_protocol: str,
+    pool: t.Optional[_RpcPool],
+) -> GroupKeyEnvelope:
+    if not server:
+        srv = await async_lookup_dc(blob.key_identifier.domain_name)
+        server = srv.target
+
+    return await _async_get_key(
+        server,
+        blob.security_descriptor,
+        blob.key_identifier.root_key_identifier,
+        blob.key_identifier.l0,
+        blob.key_identifier.l1,
+        blob.key_identifier.l2,
+        username=username,
+        password=password,
+        auth_protocol=auth_protocol,
+        pool=pool,
+    )
+
+
+async def async_ncrypt_unprotect_secrets(
+    data: t.Iterable[bytes],
+    server: t.Optional[str] = None,
+    username: t.Optional[str] = None,
+    password: t.Optional[str] = None,
+    auth_protocol: str = "negotiate",
+    cache: t.Optional[KeyCache] = None,
+) -> t.List[bytes]:
+    """Decrypt multiple DPAPI-NG Blobs.
+
+    Decrypts each DPAPI-NG blob provided like
+    :meth:`async_ncrypt_unprotect_secret` but retrieves the keys for the whole
+    batch together. Blobs protected by the same key share the one GetKey call
+    and all the calls to the same domain controller are made over the same RPC
+    connection.
+
+    Args:
+        data: The DPAPI-NG blobs to decrypt.
+        server: The domain controller to lookup the root key info.
+        username: The username to decrypt the DPAPI-NG blobs as.
+        password: The password for the user.
+        auth_protocol: The authentication protocol to use, defaults to
+            ``negotiate`` but can be ``kerberos`` or ``ntlm``.
+        cache: Optional cache that is used as the key source to avoid making
+            the RPC call.
+
+    Returns:
+        List[bytes]: The decrypted DPAPI-NG data in the same order as the
+        input blobs.
+
+    Raises:
+        ValueError: An invalid data structure was found.
+        NotImplementedError: An unknown value was found and has not been
+            implemented yet.
+    """
+    blobs = [DPAPINGBlob.unpack(b) for b in data]
+
+    batch_cache = cache or KeyCache()
+    try:
+        keys, requests = _get_batch_keys(blobs, batch_cache)
+
+        servers: t.Dict[str, str] = {}
+        retrieved: t.Dict[_BatchKey, GroupKeyEnvelope] = {}
+        for batch_key, blob in requests.items():
+            key_server = server
+            if not key_server:
+                domain_name = blob.key_identifier.domain_name
+                if domain_name not in servers:
+                    servers[domain_name] = (await async_lookup_dc(domain_name)).target
+                key_server = servers[domain_name]
+
+            rk = await _async_get_key(
+                key_server,
+                blob.security_descriptor,
+                blob.key_identifier.root_key_identifier,
+                blob.key_identifier.l0,
+                blob.key_identifier.l1,
+                blob.key_identifier.l2,
+                username=username,
+                password=password,
+                auth_protocol=auth_protocol,
+                pool=batch_cache._rpc_pool,
+            )
+            if not rk.is_public_key:
+                batch_cache._store_key(blob.security_descriptor, rk)
+            retrieved[batch_key] = rk
+    finally:
+        if not cache:
+            await batch_cache.async_close()
+
+    return [_decrypt_blob(blob, rk or retrieved[_get_batch_key(blob)], batch_cache) for blob, rk in zip(blobs, keys)]
 
 
 async def async_ncrypt_protect_secret(
@@ -857,12 +1691,9 @@ async def async_ncrypt_protect_secret(
     l1 = -1
     l2 = -1
 
-    sd = sd_to_bytes(
-        owner="S-1-5-18",
-        group="S-1-5-18",
-        dacl=[ace_to_bytes(protection_descriptor, 3), ace_to_bytes("S-1-1-0", 2)],
-    )
+    sd = protection_sd_to_bytes(protection_descriptor)
 
+    rpc_pool = cache._rpc_pool if cache else None
     cache = cache or KeyCache()
     rk = _get_protection_gke_from_cache(root_key_identifier, sd, cache)
 
@@ -881,9 +1712,10 @@ async def async_ncrypt_protect_secret(
             username=username,
             password=password,
             auth_protocol=auth_protocol,
+            pool=rpc_pool,
         )
 
     if not rk.is_public_key:
         cache._store_key(sd, rk)
 
-    return _encrypt_blob(data, rk, sd, protection_descriptor)
+    return _encrypt_blob(data, rk, protection_descriptor)
@@ -65,7 +65,7 @@ def content_decrypt(
     algorithm: str,
     parameters: t.Optional[bytes],
     cek: bytes,
-    value: bytes,
+    value: t.Union[bytes, memoryview],
 ) -> bytes:
     if algorithm == AlgorithmOID.AES256_GCM:
         if not parameters:
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import time
 import typing as t
 
 import dns.asyncresolver
@@ -16,6 +17,32 @@ class SrvRecord(t.NamedTuple):
     priority: int
 
 
+# The DC found for each domain name and when, as a time.time() value, the SRV
+# answer it came from expires. Bulk operations that don't specify a server
+# would otherwise repeat the same SRV lookup for every blob.
+_DC_CACHE: t.Dict[t.Optional[str], t.Tuple[SrvRecord, float]] = {}
+_DC_CACHE_MAX_TTL = 300
+
+
+def _get_cached_dc(
+    domain_name: t.Optional[str],
+) -> t.Optional[SrvRecord]:
+    record, expiry = _DC_CACHE.get(domain_name, (None, 0.0))
+    if record and expiry > time.time():
+        return record
+
+    return None
+
+
+def _cache_dc(
+    domain_name: t.Optional[str],
+    answer: dns.resolver.Answer,
+) -> SrvRecord:
+    record = _get_highest_answer(answer)
+    _DC_CACHE[domain_name] = (record, min(answer.expiration, time.time() + _DC_CACHE_MAX_TTL))
+    return record
+
+
 def _get_highest_answer(
     answer: dns.resolver.Answer,
 ) -> SrvRecord:
@@ -42,7 +69,8 @@ async def async_lookup_dc(
 
     Attempts to lookup LDAP server based on the domain name specified or the
     system's search domain if available. This is done through an SRV lookup for
-    '_ldap._tcp.dc._msdcs.{domain_name}'.
+    '_ldap._tcp.dc._msdcs.{domain_name}'. The result is cached for the TTL of
+    the SRV record, up to 5 minutes.
 
     Args:
         domain_name: The domain to lookup the DC for.
@@ -54,13 +82,17 @@ async def async_lookup_dc(
         dns.exception.DNSException: DNS lookup error.
     """
 
+    cached = _get_cached_dc(domain_name)
+    if cached:
+        return cached
+
     if domain_name:
         record = f"_ldap._tcp.dc._msdcs.{domain_name}"
     else:
         record = f"_ldap._tcp.dc._msdcs"
 
     answers = await dns.asyncresolver.resolve(record, "SRV", search=True)
-    return _get_highest_answer(answers)
+    return _cache_dc(domain_name, answers)
 
 
 def lookup_dc(
@@ -70,7 +102,8 @@ def lookup_dc(
 
     Attempts to lookup LDAP server based on the domain name specified or the
     system's search domain if available. This is done through an SRV lookup for
-    '_ldap._tcp.dc._msdcs.{domain_name}'.
+    '_ldap._tcp.dc._msdcs.{domain_name}'. The result is cached for the TTL of
+    the SRV record, up to 5 minutes.
 
     Args:
         domain_name: The domain to lookup the DC for.
@@ -82,10 +115,14 @@ def lookup_dc(
         dns.exception.DNSException: DNS lookup error.
     """
 
+    cached = _get_cached_dc(domain_name)
+    if cached:
+        return cached
+
     if domain_name:
         record = f"_ldap._tcp.dc._msdcs.{domain_name}"
     else:
         record = f"_ldap._tcp.dc._msdcs"
 
     answers = dns.resolver.resolve(record, "SRV", search=True)
-    return _get_highest_answer(answers)
+    return _cache_dc(domain_name, answers)
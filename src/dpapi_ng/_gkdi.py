@@ -6,6 +6,7 @@ from __future__ import annotations
 import dataclasses
 import math
 import os
+import struct
 import typing as t
 import uuid
 
@@ -20,6 +21,16 @@ KDS_SERVICE_LABEL = "KDS service\0".encode("utf-16-le")
 
 ISD_KEY = SyntaxId(uuid.UUID("b9785960-524f-11df-8b6d-83dcded72085"), 1, 0)
 
+_U32 = struct.Struct("<I")
+
+# L0, L1, L2 key ids which can be -1
+_KEY_INDEXES = struct.Struct("<iii")
+
+# version, magic, flags, l0, l1, l2, root_key_identifier, kdf_algo_len,
+# kdf_para_len, sec_algo_len, sec_para_len, priv_key_len, publ_key_len,
+# l1_key_len, l2_key_len, domain_len, forest_len
+_GROUP_KEY_ENVELOPE_HEADER = struct.Struct("<I4sIIII16sIIIIIIIIII")
+
 
 @dataclasses.dataclass
 class GetKey:
@@ -93,7 +104,7 @@ class GetKey:
     ) -> GetKey:
         view = memoryview(data)
 
-        target_sd_len = int.from_bytes(view[:4], byteorder="little")
+        target_sd_len = _U32.unpack_from(view)[0]
         target_sd = view[16 : 16 + target_sd_len].tobytes()
         padding = -target_sd_len % 8
 
@@ -107,9 +118,7 @@ class GetKey:
             root_key_id = uuid.UUID(bytes_le=view[8:24].tobytes())
             view = view[24:]
 
-        l0_key_id = int.from_bytes(view[:4], byteorder="little", signed=True)
-        l1_key_id = int.from_bytes(view[4:8], byteorder="little", signed=True)
-        l2_key_id = int.from_bytes(view[8:12], byteorder="little", signed=True)
+        l0_key_id, l1_key_id, l2_key_id = _KEY_INDEXES.unpack_from(view)
 
         return GetKey(
             target_sd=target_sd,
@@ -126,12 +135,12 @@ class GetKey:
     ) -> GroupKeyEnvelope:
         view = memoryview(data)
 
-        hresult = int.from_bytes(view[-4:], byteorder="little")
+        hresult = _U32.unpack_from(view, len(view) - 4)[0]
         view = view[:-4]
         if hresult != 0:
             raise ValueError(f"GetKey failed 0x{hresult:08X}")
 
-        key_length = int.from_bytes(view[:4], byteorder="little")
+        key_length = _U32.unpack_from(view)[0]
         view = view[8:]  # Skip padding as well
         # Skip the referent id and double up on pointer size
         return GroupKeyEnvelope.unpack(view[16 : 16 + key_length])
@@ -186,10 +195,10 @@ class KDFParameters:
     ) -> KDFParameters:
         view = memoryview(data)
 
-        if view[:8].tobytes() != b"\x00\x00\x00\x00\x01\x00\x00\x00" or view[12:16].tobytes() != b"\x00\x00\x00\x00":
+        if view[:8] != b"\x00\x00\x00\x00\x01\x00\x00\x00" or view[12:16] != b"\x00\x00\x00\x00":
             raise ValueError(f"Failed to unpack {cls.__name__} as magic identifier is invalid")
 
-        hash_length = int.from_bytes(view[8:12], byteorder="little")
+        hash_length = _U32.unpack_from(view, 8)[0]
         hash_name = view[16 : 16 + hash_length - 2].tobytes().decode("utf-16-le")
 
         return KDFParameters(hash_name=hash_name)
@@ -212,8 +221,9 @@ class FFCDHParameters:
         https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-gkdi/e15ae269-ee21-446a-a480-de3ea243db5f
     """
 
+    magic: t.ClassVar[bytes] = b"\x44\x48\x50\x4D"
+
     key_length: int
-    magic: bytes = dataclasses.field(init=False, repr=False, default=b"\x44\x48\x50\x4D")
     field_order: int
     generator: int
 
@@ -239,10 +249,10 @@ class FFCDHParameters:
         view = memoryview(data)
 
         # length = int.from_bytes(view[:4], byteorder="little")
-        if view[4:8].tobytes() != cls.magic:
+        if view[4:8] != cls.magic:
             raise ValueError(f"Failed to unpack {cls.__name__} as magic identifier is invalid")
 
-        key_length = int.from_bytes(view[8:12], byteorder="little")
+        key_length = _U32.unpack_from(view, 8)[0]
         field_order = view[12 : 12 + key_length].tobytes()
         generator = view[12 + key_length : 12 + key_length + key_length].tobytes()
 
@@ -270,7 +280,8 @@ class FFCDHKey:
         https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-gkdi/f8770f01-036d-4bf6-a4cf-1bd0e3913404
     """
 
-    magic: bytes = dataclasses.field(init=False, repr=False, default=b"\x44\x48\x50\x42")
+    magic: t.ClassVar[bytes] = b"\x44\x48\x50\x42"
+
     key_length: int
     field_order: int
     generator: int
@@ -298,10 +309,10 @@ class FFCDHKey:
     ) -> FFCDHKey:
         view = memoryview(data)
 
-        if view[:4].tobytes() != cls.magic:
+        if view[:4] != cls.magic:
             raise ValueError(f"Failed to unpack {cls.__name__} as magic identifier is invalid")
 
-        key_length = int.from_bytes(view[4:8], byteorder="little")
+        key_length = _U32.unpack_from(view, 4)[0]
 
         field_order = view[8 : 8 + key_length].tobytes()
         view = view[8 + key_length :]
@@ -337,7 +348,8 @@ class ECDHKey:
         https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-gkdi/24876a37-9a92-4187-9052-222bb6f85d4a
     """
 
-    magic: bytes = dataclasses.field(init=False, repr=False, default=b"\x45\x43\x4B")
+    magic: t.ClassVar[bytes] = b"\x45\x43\x4B"
+
     curve_name: str
     key_length: int
     x: int
@@ -379,7 +391,7 @@ class ECDHKey:
     ) -> ECDHKey:
         view = memoryview(data)
 
-        curve_id = int.from_bytes(view[:4], byteorder="little")
+        curve_id = _U32.unpack_from(view)[0]
         curve = {
             0x314B4345: "P256",
             0x334B4345: "P384",
@@ -388,7 +400,7 @@ class ECDHKey:
         if not curve:
             raise ValueError(f"Failed to unpack {cls.__name__} with unknown curve 0x{curve_id:08X}")
 
-        length = int.from_bytes(view[4:8], byteorder="little")
+        length = _U32.unpack_from(view, 4)[0]
 
         x = view[8 : 8 + length].tobytes()
         view = view[8 + length :]
@@ -434,8 +446,9 @@ class GroupKeyEnvelope:
         https://learn.microsoft.com/en-us/openspecs/windows_protocols/ms-gkdi/192c061c-e740-4aa0-ab1d-6954fb3e58f7
     """
 
+    magic: t.ClassVar[bytes] = b"\x4B\x44\x53\x4B"
+
     version: int
-    magic: bytes = dataclasses.field(init=False, repr=False, default=b"\x4B\x44\x53\x4B")
     flags: int
     l0: int
     l1: int
@@ -570,7 +583,7 @@ class GroupKeyEnvelope:
             l0=self.l0,
             l1=self.l1,
             l2=self.l2,
-            root_key_identifier=self.root_key_identifier,
+            root_key_identifier_bytes_le=self.root_key_identifier.bytes_le,
             key_info=key_info,
             domain_name=self.domain_name,
             forest_name=self.forest_name,
@@ -584,27 +597,31 @@ class GroupKeyEnvelope:
     ) -> GroupKeyEnvelope:
         view = memoryview(data)
 
-        version = int.from_bytes(view[:4], byteorder="little")
-
-        if view[4:8].tobytes() != cls.magic:
+        if view[4:8] != cls.magic:
             raise ValueError(f"Failed to unpack {cls.__name__} as magic identifier is invalid")
 
-        flags = int.from_bytes(view[8:12], byteorder="little")
-        l0_index = int.from_bytes(view[12:16], byteorder="little")
-        l1_index = int.from_bytes(view[16:20], byteorder="little")
-        l2_index = int.from_bytes(view[20:24], byteorder="little")
-        root_key_identifier = uuid.UUID(bytes_le=view[24:40].tobytes())
-        kdf_algo_len = int.from_bytes(view[40:44], byteorder="little")
-        kdf_para_len = int.from_bytes(view[44:48], byteorder="little")
-        sec_algo_len = int.from_bytes(view[48:52], byteorder="little")
-        sec_para_len = int.from_bytes(view[52:56], byteorder="little")
-        priv_key_len = int.from_bytes(view[56:60], byteorder="little")
-        publ_key_len = int.from_bytes(view[60:64], byteorder="little")
-        l1_key_len = int.from_bytes(view[64:68], byteorder="little")
-        l2_key_len = int.from_bytes(view[68:72], byteorder="little")
-        domain_len = int.from_bytes(view[72:76], byteorder="little")
-        forest_len = int.from_bytes(view[76:80], byteorder="little")
-        view = view[80:]
+        (
+            version,
+            _,
+            flags,
+            l0_index,
+            l1_index,
+            l2_index,
+            b_root_key_identifier,
+            kdf_algo_len,
+            kdf_para_len,
+            sec_algo_len,
+            sec_para_len,
+            priv_key_len,
+            publ_key_len,
+            l1_key_len,
+            l2_key_len,
+            domain_len,
+            forest_len,
+        ) = _GROUP_KEY_ENVELOPE_HEADER.unpack_from(view)
+
+        root_key_identifier = uuid.UUID(bytes_le=b_root_key_identifier)
+        view = view[_GROUP_KEY_ENVELOPE_HEADER.size :]
 
         kdf_algo = view[: kdf_algo_len - 2].tobytes().decode("utf-16-le")
         view = view[kdf_algo_len:]
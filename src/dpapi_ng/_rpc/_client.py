@@ -37,6 +37,7 @@ async def async_create_rpc_connection(
     username: t.Optional[str] = None,
     password: t.Optional[str] = None,
     auth_protocol: t.Optional[str] = None,
+    read_timeout: t.Optional[float] = None,
 ) -> AsyncRpcClient:
     auth_provider = None
     if auth_protocol:
@@ -45,7 +46,7 @@ async def async_create_rpc_connection(
     conn_future = asyncio.open_connection(server, port=port)
     reader, writer = await asyncio.wait_for(conn_future, connection_timeout)
 
-    return AsyncRpcClient(reader, writer, auth_provider)
+    return AsyncRpcClient(reader, writer, auth_provider, read_timeout=read_timeout)
 
 
 def create_rpc_connection(
@@ -55,6 +56,7 @@ def create_rpc_connection(
     username: t.Optional[str] = None,
     password: t.Optional[str] = None,
     auth_protocol: t.Optional[str] = None,
+    read_timeout: t.Optional[float] = None,
 ) -> SyncRpcClient:
     auth_provider = None
     if auth_protocol:
@@ -64,7 +66,7 @@ def create_rpc_connection(
         (server, port),
         timeout=connection_timeout,
     )
-    sock.settimeout(None)
+    sock.settimeout(read_timeout)
 
     return SyncRpcClient(sock, auth_provider)
 
@@ -150,13 +152,16 @@ class RpcClient:
         opnum: int,
         stub_data: bytes,
         *,
-        verification_trailer: t.Optional[VerificationTrailer] = None,
+        verification_trailer: t.Optional[t.Union[VerificationTrailer, bytes]] = None,
     ) -> tuple[Request, t.Optional[tuple[int, int]]]:
         if verification_trailer:
+            if isinstance(verification_trailer, VerificationTrailer):
+                verification_trailer = verification_trailer.pack()
+
             # The verification trailer needs to be aligned to the next 4 byte
             # boundary.
             padding = -len(stub_data) % 4
-            stub_data += (b"\x00" * padding) + verification_trailer.pack()
+            stub_data += (b"\x00" * padding) + verification_trailer
 
         auth_len = 0
         sec_trailer = None
@@ -263,10 +268,13 @@ class AsyncRpcClient(RpcClient):
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
         auth: t.Optional[AuthenticationProvider] = None,
+        *,
+        read_timeout: t.Optional[float] = None,
     ) -> None:
         super().__init__(auth)
         self._reader = reader
         self._writer = writer
+        self._read_timeout = read_timeout
 
     async def __aenter__(self) -> AsyncRpcClient:
         return self
@@ -315,7 +323,7 @@ class AsyncRpcClient(RpcClient):
         opnum: int,
         stub_data: bytes,
         *,
-        verification_trailer: t.Optional[VerificationTrailer] = None,
+        verification_trailer: t.Optional[t.Union[VerificationTrailer, bytes]] = None,
     ) -> Response:
         req, encrypt_offsets = self._create_request(
             context_id,
@@ -337,13 +345,13 @@ class AsyncRpcClient(RpcClient):
         self._writer.write(b_pdu)
         await self._writer.drain()
 
-        header = await self._reader.readexactly(16)
+        header = await asyncio.wait_for(self._reader.readexactly(16), self._read_timeout)
         resp_header = PDUHeader.unpack(header)
 
         resp = bytearray(resp_header.frag_len)
         view = memoryview(resp)
         view[:16] = header
-        view[16:] = await self._reader.readexactly(len(resp) - 16)
+        view[16:] = await asyncio.wait_for(self._reader.readexactly(len(resp) - 16), self._read_timeout)
 
         return self._process_response(resp, resp_header, resp_type, encrypt_offsets)
 
@@ -412,7 +420,7 @@ class SyncRpcClient(RpcClient):
         opnum: int,
         stub_data: bytes,
         *,
-        verification_trailer: t.Optional[VerificationTrailer] = None,
+        verification_trailer: t.Optional[t.Union[VerificationTrailer, bytes]] = None,
     ) -> Response:
         req, encrypt_offsets = self._create_request(
             context_id,
@@ -433,6 +441,8 @@ class SyncRpcClient(RpcClient):
         self._sock.sendall(b_pdu)
 
         header = self._sock.recv(16)
+        if not header:
+            raise EOFError("RPC connection was closed by the remote host")
         resp_header = PDUHeader.unpack(header)
 
         resp = bytearray(resp_header.frag_len)
@@ -442,6 +452,8 @@ class SyncRpcClient(RpcClient):
 
         while view:
             read = self._sock.recv_into(view)
+            if not read:
+                raise EOFError("RPC connection was closed by the remote host")
             view = view[read:]
 
         return self._process_response(resp, resp_header, resp_type, encrypt_offsets)
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import functools
 import re
 import typing as t
 
@@ -109,3 +110,20 @@ def sd_to_bytes(
             dynamic_data,
         ]
     )
+
+
+_ACE_EVERYONE = ace_to_bytes("S-1-1-0", 2)
+
+
+@functools.lru_cache(maxsize=1024)
+def protection_sd_to_bytes(protection_descriptor: str) -> bytes:
+    # Build the target security descriptor from the SID passed in. This SD
+    # contains an ACE per target user with a mask of 0x3 and a final ACE of the
+    # current user with a mask of 0x2. When viewing this over the wire the
+    # current user is set as S-1-1-0 (World) and the owner/group is S-1-5-18
+    # (SYSTEM).
+    return sd_to_bytes(
+        owner="S-1-5-18",
+        group="S-1-5-18",
+        dacl=[ace_to_bytes(protection_descriptor, 3), _ACE_EVERYONE],
+    )
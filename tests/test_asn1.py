@@ -275,9 +275,29 @@ def test_writer_write_object_identifier() -> None:
     assert actual == expected
 
 
+def test_writer_write_raw_object_identifier() -> None:
+    expected = b"\x06\t*\x86H\x86\xf7\r\x01\x07\x03"
+    with asn1.ASN1Writer() as writer:
+        writer.write_raw_object_identifier(asn1.encode_object_identifier("1.2.840.113549.1.7.3"))
+
+    actual = writer.get_data()
+    assert actual == expected
+
+
+def test_writer_write_raw() -> None:
+    expected = b"\x30\x05\x02\x01\x01\x05\x00"
+    with asn1.ASN1Writer() as writer:
+        with writer.push_sequence() as seq:
+            seq.write_integer(1)
+            seq.write_raw(b"\x05\x00")
+
+    actual = writer.get_data()
+    assert actual == expected
+
+
 def test_fail_pack_invalid_object_identifier() -> None:
     with pytest.raises(ValueError, match="Illegal object identifier"):
-        asn1._encode_object_identifier("40.50.1.2.3")
+        asn1.encode_object_identifier("40.50.1.2.3")
 
 
 def test_writer_write_enumerated() -> None:
@@ -5,6 +5,8 @@ from __future__ import annotations
 
 import uuid
 
+import pytest
+
 from dpapi_ng import _blob as blob
 
 from .conftest import get_test_data
@@ -24,6 +26,7 @@ def test_blob_unpack() -> None:
     assert msg.key_identifier.key_info == get_test_data("ffc_dh_key")
     assert msg.key_identifier.domain_name == "domain.test"
     assert msg.key_identifier.forest_name == "domain.test"
+    assert msg.protection_descriptor == "S-1-5-21-3337337973-3297078028-437386066-512"
     assert msg.security_descriptor == (
         b"\x01\x00\x04\x80\x54\x00\x00\x00"
         b"\x60\x00\x00\x00\x00\x00\x00\x00"
@@ -49,6 +52,7 @@ def test_blob_unpack() -> None:
     )
     assert msg.enc_cek_algorithm == "2.16.840.1.101.3.4.1.45"
     assert msg.enc_cek_parameters is None
+    assert isinstance(msg.enc_content, memoryview)
     assert msg.enc_content == (
         b"\xE4\xCD\xF6\x54\x72\x2A\x49\xD5"
         b"\x5F\x53\x08\x55\x0E\xC4\xE8\xAA"
@@ -72,3 +76,77 @@ def test_blob_unpack() -> None:
     )
     assert msg.enc_content_algorithm == "2.16.840.1.101.3.4.1.46"
     assert msg.enc_content_parameters == b"\x30\x11\x04\x0C\x9E\x5B\x2E\x17\xC2\x3F\x04\xFC\x35\x25\xE1\x18\x02\x01\x10"
+
+
+def test_blob_pack_appended_content() -> None:
+    data = get_test_data("dpapi_ng_blob")
+
+    msg = blob.DPAPINGBlob.unpack(data)
+    actual = msg.pack(blob_in_envelope=False)
+    assert actual == data
+
+
+def test_blob_pack_in_envelope() -> None:
+    data = get_test_data("dpapi_ng_blob")
+
+    msg = blob.DPAPINGBlob.unpack(data)
+    actual = blob.DPAPINGBlob.unpack(msg.pack())
+    assert actual == msg
+
+
+def test_key_identifier_pack_unpack() -> None:
+    key_id = blob.KeyIdentifier(
+        version=1,
+        flags=2,
+        l0=361,
+        l1=16,
+        l2=3,
+        root_key_identifier_bytes_le=uuid.UUID("d778c271-9025-9a82-f6dc-b8960b8ad8c5").bytes_le,
+        key_info=b"\x01\x02\x03\x04",
+        domain_name="domain.test",
+        forest_name="forest.test",
+    )
+
+    data = key_id.pack()
+    assert data[:4] == b"\x01\x00\x00\x00"
+    assert data[4:8] == b"\x4B\x44\x53\x4B"
+    assert len(data) == 52 + 4 + 24 + 24
+    assert key_id.pack() is data
+
+    actual = blob.KeyIdentifier.unpack(data)
+    assert actual == key_id
+
+    actual = blob.KeyIdentifier.unpack(memoryview(bytearray(data)))
+    assert actual == key_id
+
+    root_key_identifier = actual.root_key_identifier
+    assert root_key_identifier == uuid.UUID("d778c271-9025-9a82-f6dc-b8960b8ad8c5")
+    assert actual.root_key_identifier is root_key_identifier
+
+
+def test_key_identifier_pack_unpack_empty_names() -> None:
+    key_id = blob.KeyIdentifier(1, 2, 0, 0, 0, uuid.UUID(int=0).bytes_le, b"", "", "")
+
+    actual = blob.KeyIdentifier.unpack(key_id.pack())
+    assert actual.domain_name == ""
+    assert actual.forest_name == ""
+    assert actual == key_id
+
+
+def test_key_identifier_unpack_invalid_magic() -> None:
+    data = b"\x01\x00\x00\x00\x00\x00\x00\x00" + (b"\x00" * 44)
+
+    with pytest.raises(ValueError, match="Failed to unpack KeyIdentifier as magic identifier is invalid"):
+        blob.KeyIdentifier.unpack(data)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"", "magic identifier is invalid"),
+        (b"\x01\x00\x00\x00\x4B\x44\x53\x4B\x00\x00\x00\x00", "data is too short"),
+    ],
+)
+def test_key_identifier_unpack_short_data(data: bytes, expected: str) -> None:
+    with pytest.raises(ValueError, match=f"Failed to unpack KeyIdentifier as {expected}"):
+        blob.KeyIdentifier.unpack(data)
@@ -3,11 +3,18 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import collections
+import concurrent.futures
 import json
 import os
+import pathlib
+import pickle
+import time
 import typing as t
 import uuid
+from unittest import mock
 
 import pytest
 from cryptography.hazmat.primitives.asymmetric import ec
@@ -270,3 +277,708 @@ async def test_async_unprotect_secret(
 
     actual = await dpapi_ng.async_ncrypt_unprotect_secret(data, cache=key_cache)
     assert actual == expected
+
+
+class _FakeRpc:
+    def __init__(self, error: t.Optional[BaseException] = None) -> None:
+        self.error = error
+        self.closed = False
+        self.requests = 0
+
+    def request(self, *args: t.Any, **kwargs: t.Any) -> t.Any:
+        self.requests += 1
+        if self.error:
+            raise self.error
+
+        return b"response"
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _AsyncFakeRpc(_FakeRpc):
+    async def request(self, *args: t.Any, **kwargs: t.Any) -> t.Any:
+        if isinstance(self.error, asyncio.CancelledError):
+            # Wait to be cancelled like a request blocked on a read.
+            self.requests += 1
+            await asyncio.sleep(10)
+
+        return _FakeRpc.request(self, *args, **kwargs)
+
+    async def close(self) -> None:  # type: ignore[override]
+        _FakeRpc.close(self)
+
+
+def test_sync_get_key_reuses_pooled_connection(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    connections: list[_FakeRpc] = []
+
+    def connect(*args: t.Any, **kwargs: t.Any) -> _FakeRpc:
+        rpc = _FakeRpc()
+        connections.append(rpc)
+        return rpc
+
+    monkeypatch.setattr(client, "_sync_connect_isd_key", connect)
+    monkeypatch.setattr(client, "_process_get_key_result", lambda resp: resp)
+
+    cache = dpapi_ng.KeyCache()
+    for _ in range(3):
+        actual = client._sync_get_key("dc", b"", None, pool=cache._rpc_pool)
+        assert actual == b"response"
+
+    assert len(connections) == 1
+    assert connections[0].requests == 3
+    assert not connections[0].closed
+
+    cache.close()
+    assert connections[0].closed
+
+
+def test_sync_get_key_without_pool_closes_connection(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    connections: list[_FakeRpc] = []
+
+    def connect(*args: t.Any, **kwargs: t.Any) -> _FakeRpc:
+        rpc = _FakeRpc()
+        connections.append(rpc)
+        return rpc
+
+    monkeypatch.setattr(client, "_sync_connect_isd_key", connect)
+    monkeypatch.setattr(client, "_process_get_key_result", lambda resp: resp)
+
+    client._sync_get_key("dc", b"", None)
+    client._sync_get_key("dc", b"", None)
+
+    assert len(connections) == 2
+    assert all(rpc.closed for rpc in connections)
+
+
+def test_sync_get_key_retries_stale_connection(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    new_rpc = _FakeRpc()
+    monkeypatch.setattr(client, "_sync_connect_isd_key", lambda *args, **kwargs: new_rpc)
+    monkeypatch.setattr(client, "_process_get_key_result", lambda resp: resp)
+
+    cache = dpapi_ng.KeyCache()
+    stale_rpc = _FakeRpc(error=EOFError("connection closed"))
+    cache._rpc_pool.release_sync(("dc", None, None, "negotiate"), stale_rpc)  # type: ignore[arg-type]
+
+    actual = client._sync_get_key("dc", b"", None, pool=cache._rpc_pool)
+    assert actual == b"response"
+    assert stale_rpc.closed
+    assert not new_rpc.closed
+    assert cache._rpc_pool.acquire_sync(("dc", None, None, "negotiate")) is new_rpc
+
+
+def test_sync_get_key_pooled_connection_error(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def connect(*args: t.Any, **kwargs: t.Any) -> _FakeRpc:
+        raise Exception("should not be called")
+
+    monkeypatch.setattr(client, "_sync_connect_isd_key", connect)
+
+    cache = dpapi_ng.KeyCache()
+    rpc = _FakeRpc(error=ValueError("GetKey failed"))
+    cache._rpc_pool.release_sync(("dc", None, None, "negotiate"), rpc)  # type: ignore[arg-type]
+
+    with pytest.raises(ValueError, match="GetKey failed"):
+        client._sync_get_key("dc", b"", None, pool=cache._rpc_pool)
+
+    assert rpc.closed
+    assert cache._rpc_pool.acquire_sync(("dc", None, None, "negotiate")) is None
+
+
+def test_rpc_pool_idle_connection_expires(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = 100.0
+    monkeypatch.setattr(client.time, "monotonic", lambda: now)
+
+    pool = client._RpcPool()
+    old_rpc = _FakeRpc()
+    new_rpc = _FakeRpc()
+    pool.release_sync(("dc", None, None, "negotiate"), old_rpc)  # type: ignore[arg-type]
+    now += client._RPC_IDLE_TIMEOUT - 1
+    pool.release_sync(("dc", None, None, "negotiate"), new_rpc)  # type: ignore[arg-type]
+    now += 1
+
+    assert pool.acquire_sync(("dc", None, None, "negotiate")) is new_rpc
+    assert old_rpc.closed
+    assert not new_rpc.closed
+    assert pool.acquire_sync(("dc", None, None, "negotiate")) is None
+
+
+def test_key_cache_context_manager_closes_connections() -> None:
+    rpc = _FakeRpc()
+    with dpapi_ng.KeyCache() as cache:
+        cache._rpc_pool.release_sync(("dc", None, None, "negotiate"), rpc)  # type: ignore[arg-type]
+
+    assert rpc.closed
+
+
+@pytest.mark.asyncio
+async def test_key_cache_async_context_manager_closes_connections() -> None:
+    rpc = _AsyncFakeRpc()
+    async with dpapi_ng.KeyCache() as cache:
+        cache._rpc_pool.release_async(("dc", None, None, "negotiate"), rpc)  # type: ignore[arg-type]
+
+    assert rpc.closed
+
+
+@pytest.mark.asyncio
+async def test_async_get_key_cancelled_closes_pooled_connection(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def connect(*args: t.Any, **kwargs: t.Any) -> _AsyncFakeRpc:
+        raise Exception("should not be called")
+
+    monkeypatch.setattr(client, "_async_connect_isd_key", connect)
+
+    cache = dpapi_ng.KeyCache()
+    rpc = _AsyncFakeRpc(error=asyncio.CancelledError())
+    cache._rpc_pool.release_async(("dc", None, None, "negotiate"), rpc)  # type: ignore[arg-type]
+
+    task = asyncio.ensure_future(client._async_get_key("dc", b"", None, pool=cache._rpc_pool))
+    while not rpc.requests:
+        await asyncio.sleep(0)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert rpc.closed
+    assert await cache._rpc_pool.acquire_async(("dc", None, None, "negotiate")) is None
+
+
+@pytest.mark.asyncio
+async def test_async_get_key_reuses_pooled_connection(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    connections: list[_AsyncFakeRpc] = []
+
+    async def connect(*args: t.Any, **kwargs: t.Any) -> _AsyncFakeRpc:
+        rpc = _AsyncFakeRpc()
+        connections.append(rpc)
+        return rpc
+
+    monkeypatch.setattr(client, "_async_connect_isd_key", connect)
+    monkeypatch.setattr(client, "_process_get_key_result", lambda resp: resp)
+
+    cache = dpapi_ng.KeyCache()
+    for _ in range(3):
+        actual = await client._async_get_key("dc", b"", None, pool=cache._rpc_pool)
+        assert actual == b"response"
+
+    assert len(connections) == 1
+    assert connections[0].requests == 3
+
+    await cache.async_close()
+    assert connections[0].closed
+
+
+def test_async_get_key_pooled_connection_other_loop(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class LoopFakeRpc(_AsyncFakeRpc):
+        def __init__(self) -> None:
+            super().__init__()
+            self.loop = asyncio.get_running_loop()
+
+        async def request(self, *args: t.Any, **kwargs: t.Any) -> t.Any:
+            if asyncio.get_running_loop() is not self.loop:
+                raise RuntimeError("got Future attached to a different loop")
+
+            return await super().request(*args, **kwargs)
+
+    connections: list[LoopFakeRpc] = []
+
+    async def connect(*args: t.Any, **kwargs: t.Any) -> LoopFakeRpc:
+        rpc = LoopFakeRpc()
+        connections.append(rpc)
+        return rpc
+
+    monkeypatch.setattr(client, "_async_connect_isd_key", connect)
+    monkeypatch.setattr(client, "_process_get_key_result", lambda resp: resp)
+
+    cache = dpapi_ng.KeyCache()
+
+    async def get_key() -> t.Any:
+        return await client._async_get_key("dc", b"", None, pool=cache._rpc_pool)
+
+    assert asyncio.run(get_key()) == b"response"
+    assert asyncio.run(get_key()) == b"response"
+
+    assert len(connections) == 2
+    assert connections[0].requests == 1
+    assert connections[1].requests == 1
+    assert cache._rpc_pool._async_idle == {
+        (connections[1].loop, ("dc", None, None, "negotiate")): [(connections[1], mock.ANY)]
+    }
+
+
+@pytest.mark.asyncio
+async def test_async_unprotect_secret_dedupes_concurrent_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha256_dh")
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    rk = key_cache._get_key(
+        blob.security_descriptor,
+        blob.key_identifier.root_key_identifier,
+        blob.key_identifier.l0,
+        blob.key_identifier.l1,
+        blob.key_identifier.l2,
+    )
+    assert rk
+
+    calls = 0
+
+    async def get_key(*args: t.Any, **kwargs: t.Any) -> gkdi.GroupKeyEnvelope:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        assert rk
+        return rk
+
+    monkeypatch.setattr(client, "_async_get_key", get_key)
+
+    cache = dpapi_ng.KeyCache()
+    actual = await asyncio.gather(
+        *[dpapi_ng.async_ncrypt_unprotect_secret(data, server="dc", cache=cache) for _ in range(5)]
+    )
+    assert actual == [b"\x00"] * 5
+    assert calls == 1
+    assert cache._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_async_unprotect_secret_dedupes_per_credential(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha256_dh")
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    rk = key_cache._get_key(
+        blob.security_descriptor,
+        blob.key_identifier.root_key_identifier,
+        blob.key_identifier.l0,
+        blob.key_identifier.l1,
+        blob.key_identifier.l2,
+    )
+    assert rk
+
+    calls = 0
+
+    async def get_key(*args: t.Any, **kwargs: t.Any) -> gkdi.GroupKeyEnvelope:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        if kwargs["username"] == "bad":
+            raise PermissionError("access denied")
+
+        assert rk
+        return rk
+
+    monkeypatch.setattr(client, "_async_get_key", get_key)
+
+    cache = dpapi_ng.KeyCache()
+    actual = await asyncio.gather(
+        dpapi_ng.async_ncrypt_unprotect_secret(data, server="dc", username="bad", cache=cache),
+        dpapi_ng.async_ncrypt_unprotect_secret(data, server="dc", username="good", cache=cache),
+        return_exceptions=True,
+    )
+    assert isinstance(actual[0], PermissionError)
+    assert actual[1] == b"\x00"
+    assert calls == 2
+    assert cache._inflight == {}
+
+
+def test_key_cache_prewarm(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha256_nonce")
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    key_id = blob.key_identifier
+
+    assert key_cache._peek_key(blob.security_descriptor, key_id.root_key_identifier, key_id.l0, 0, 0) is None
+
+    key_cache.prewarm(key_id.root_key_identifier, blob.protection_descriptor, [key_id.l0])
+    assert key_cache._peek_key(blob.security_descriptor, key_id.root_key_identifier, key_id.l0, 31, 31)
+
+    def compute_l1_key(*args: t.Any, **kwargs: t.Any) -> bytes:
+        raise Exception("should not be called")
+
+    monkeypatch.setattr(client, "compute_l1_key", compute_l1_key)
+    actual = dpapi_ng.ncrypt_unprotect_secret(data, cache=key_cache)
+    assert actual == b"\x00"
+
+
+def test_key_cache_prewarm_missing_root_key() -> None:
+    cache = dpapi_ng.KeyCache()
+    root_key_id = uuid.uuid4()
+
+    with pytest.raises(ValueError, match=f"Root key {root_key_id} has not been loaded"):
+        cache.prewarm(root_key_id, "S-1-1-0")
+
+
+def test_protection_gke_key_indexes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha256_nonce")
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+
+    filetime = 361 * client._L0_DIV + 17 * client._L1_DIV + 31 * client._L2_DIV + client._L2_DIV - 1
+    monkeypatch.setattr(client.time, "time_ns", lambda: (filetime - client._EPOCH_FILETIME) * 100)
+
+    actual = client._get_protection_gke_from_cache(
+        blob.key_identifier.root_key_identifier,
+        blob.security_descriptor,
+        key_cache,
+    )
+    assert actual
+    assert actual.l0 == 361
+    assert actual.l1 == 17
+    assert actual.l2 == 31
+
+
+def _protect_at_indexes(
+    monkeypatch: pytest.MonkeyPatch,
+    key_cache: dpapi_ng.KeyCache,
+    indexes: t.List[t.Tuple[int, int, int]],
+) -> t.List[bytes]:
+    root_key_id = list(key_cache._root_keys.keys())[0]
+    blobs = []
+    with monkeypatch.context() as m:
+        for l0, l1, l2 in indexes:
+            now = l0 * client._L0_NS + l1 * client._L1_NS + l2 * client._L2_NS - client._EPOCH_FILETIME_NS
+            m.setattr(client.time, "time_ns", lambda: now)
+            blobs.append(
+                dpapi_ng.ncrypt_protect_secret(
+                    b"\x00",
+                    "S-1-5-21-2185496602-3367037166-1388177638-1103",
+                    root_key_identifier=root_key_id,
+                    cache=key_cache,
+                )
+            )
+
+    return blobs
+
+
+def test_unprotect_secrets_groups_key_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    key_cache = _load_root_key("kdf_sha512_nonce")[1]
+    l0 = (time.time_ns() + client._EPOCH_FILETIME_NS) // client._L0_NS
+    indexes = [(l0, 3, 5), (l0, 10, 7), (l0, 10, 2), (l0 + 1, 1, 1)]
+    blobs = _protect_at_indexes(monkeypatch, key_cache, indexes)
+    for blob, (l0_idx, l1_idx, l2_idx) in zip(blobs, indexes):
+        key_id = dpapi_ng._blob.DPAPINGBlob.unpack(blob).key_identifier
+        assert (key_id.l0, key_id.l1, key_id.l2) == (l0_idx, l1_idx, l2_idx)
+
+    requests = []
+
+    def get_key(
+        server: str,
+        target_sd: bytes,
+        root_key_id: uuid.UUID,
+        l0: int,
+        l1: int,
+        l2: int,
+        *args: t.Any,
+        **kwargs: t.Any,
+    ) -> gkdi.GroupKeyEnvelope:
+        requests.append((server, l0, l1, l2))
+        rk = key_cache._get_key(target_sd, root_key_id, l0, l1, l2)
+        assert rk
+        return rk
+
+    monkeypatch.setattr(client, "_sync_get_key", get_key)
+
+    cache = dpapi_ng.KeyCache()
+    actual = dpapi_ng.ncrypt_unprotect_secrets(blobs, server="dc", cache=cache)
+    assert actual == [b"\x00"] * 4
+    assert sorted(requests) == [("dc", l0, 10, 7), ("dc", l0 + 1, 1, 1)]
+
+    actual = dpapi_ng.ncrypt_unprotect_secrets(blobs[:1], server="dc", cache=cache)
+    assert actual == [b"\x00"]
+    assert len(requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_unprotect_secrets_groups_key_requests(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    key_cache = _load_root_key("kdf_sha512_nonce")[1]
+    l0 = (time.time_ns() + client._EPOCH_FILETIME_NS) // client._L0_NS
+    indexes = [(l0, 3, 5), (l0, 10, 7), (l0, 10, 2), (l0 + 1, 1, 1)]
+    blobs = _protect_at_indexes(monkeypatch, key_cache, indexes)
+
+    requests = []
+
+    async def get_key(
+        server: str,
+        target_sd: bytes,
+        root_key_id: uuid.UUID,
+        l0: int,
+        l1: int,
+        l2: int,
+        *args: t.Any,
+        **kwargs: t.Any,
+    ) -> gkdi.GroupKeyEnvelope:
+        requests.append((server, l0, l1, l2))
+        rk = key_cache._get_key(target_sd, root_key_id, l0, l1, l2)
+        assert rk
+        return rk
+
+    monkeypatch.setattr(client, "_async_get_key", get_key)
+
+    actual = await dpapi_ng.async_ncrypt_unprotect_secrets(blobs, server="dc")
+    assert actual == [b"\x00"] * 4
+    assert sorted(requests) == [("dc", l0, 10, 7), ("dc", l0 + 1, 1, 1)]
+
+
+def test_unprotect_secrets_from_cache() -> None:
+    data1, key_cache = _load_root_key("kdf_sha1_dh")
+    data2, key_cache2 = _load_root_key("kdf_sha384_ecdh_p256")
+    key_cache._root_keys.update(key_cache2._root_keys)
+
+    actual = dpapi_ng.ncrypt_unprotect_secrets([data1, data2, data1], cache=key_cache)
+    assert actual == [b"\x00"] * 3
+
+
+@pytest.mark.parametrize("scenario", ["kdf_sha1_nonce", "kdf_sha256_dh", "kdf_sha512_ecdh_p384"])
+def test_key_cache_save_load(
+    scenario: str,
+    tmp_path: pathlib.Path,
+) -> None:
+    data, key_cache = _load_root_key(scenario)
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    key_id = blob.key_identifier
+    key_cache._get_key(blob.security_descriptor, key_id.root_key_identifier, key_id.l0, key_id.l1, key_id.l2)
+
+    cache_path = tmp_path / "cache.json"
+    key_cache.save(str(cache_path))
+    assert cache_path.stat().st_mode & 0o777 == 0o600 or os.name == "nt"
+
+    actual = dpapi_ng.KeyCache()
+    actual.load(str(cache_path))
+    assert actual._root_keys == key_cache._root_keys
+    assert actual._seed_keys == key_cache._seed_keys
+
+    # Ensure the seed key alone can decrypt the blob.
+    actual._root_keys = {}
+    assert dpapi_ng.ncrypt_unprotect_secret(data, cache=actual) == b"\x00"
+
+
+@pytest.mark.parametrize("scenario", ["kdf_sha1_nonce", "kdf_sha256_dh", "kdf_sha512_ecdh_p384"])
+def test_key_cache_pickle(
+    scenario: str,
+) -> None:
+    data, key_cache = _load_root_key(scenario)
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    key_id = blob.key_identifier
+    key_cache._get_key(blob.security_descriptor, key_id.root_key_identifier, key_id.l0, key_id.l1, key_id.l2)
+    assert dpapi_ng.ncrypt_unprotect_secret(data, cache=key_cache) == b"\x00"
+    assert key_cache._ceks
+
+    actual = pickle.loads(pickle.dumps(key_cache))
+    assert actual._root_keys == key_cache._root_keys
+    assert actual._seed_keys == key_cache._seed_keys
+    assert actual._lock is not key_cache._lock
+    assert actual._rpc_pool is not key_cache._rpc_pool
+    assert actual._ceks == collections.OrderedDict()
+    assert actual._inflight == {}
+
+    # Ensure the unpickled seed key alone can decrypt the blob.
+    actual._root_keys = {}
+    assert dpapi_ng.ncrypt_unprotect_secret(data, cache=actual) == b"\x00"
+
+
+def test_key_cache_save_closes_fd_on_failure(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: pathlib.Path,
+) -> None:
+    fds = []
+    os_open = os.open
+
+    def open_fd(*args: t.Any, **kwargs: t.Any) -> int:
+        fd = os_open(*args, **kwargs)
+        fds.append(fd)
+        return fd
+
+    def open_file(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        raise MemoryError()
+
+    monkeypatch.setattr(client.os, "open", open_fd)
+    monkeypatch.setattr(client, "open", open_file, raising=False)
+
+    with pytest.raises(MemoryError):
+        dpapi_ng.KeyCache().save(str(tmp_path / "cache.json"))
+
+    assert len(fds) == 1
+    with pytest.raises(OSError):
+        os.fstat(fds[0])
+
+
+def test_key_cache_load_invalid_version(
+    tmp_path: pathlib.Path,
+) -> None:
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text(json.dumps({"version": 2}))
+
+    with pytest.raises(ValueError, match="Unknown key cache file version 2"):
+        dpapi_ng.KeyCache().load(str(cache_path))
+
+
+def test_rpc_pool_isd_key_port_expires(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    now = 100.0
+    monkeypatch.setattr(client.time, "monotonic", lambda: now)
+
+    pool = client._RpcPool()
+    assert pool.get_isd_key_port("dc") is None
+
+    pool.set_isd_key_port("dc", 49667)
+    assert pool.get_isd_key_port("dc") == 49667
+
+    now += client._ISD_KEY_PORT_TTL
+    assert pool.get_isd_key_port("dc") is None
+
+
+def test_sync_connect_isd_key_refreshes_stale_port(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class FakeEpmRpc(_FakeRpc):
+        def __enter__(self) -> FakeEpmRpc:
+            return self
+
+        def __exit__(self, *args: t.Any) -> None:
+            self.close()
+
+        def bind(self, *args: t.Any, **kwargs: t.Any) -> None:
+            return None
+
+    bound_ports = []
+    new_rpc = _FakeRpc()
+
+    def bind_isd_key(server: str, port: int, *args: t.Any) -> _FakeRpc:
+        bound_ports.append(port)
+        if port == 1:
+            raise ConnectionRefusedError()
+
+        return new_rpc
+
+    monkeypatch.setattr(client, "_sync_bind_isd_key", bind_isd_key)
+    monkeypatch.setattr(client, "create_rpc_connection", lambda *args, **kwargs: FakeEpmRpc())
+    monkeypatch.setattr(client, "_process_bind_result", lambda *args: None)
+    monkeypatch.setattr(client, "_process_ept_map_result", lambda resp: 2)
+
+    pool = client._RpcPool()
+    pool.set_isd_key_port("dc", 1)
+
+    actual = client._sync_connect_isd_key("dc", None, None, "negotiate", pool)
+    assert actual is new_rpc
+    assert bound_ports == [1, 2]
+    assert pool.get_isd_key_port("dc") == 2
+
+
+@pytest.mark.asyncio
+async def test_async_connect_isd_key_refreshes_timed_out_port(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class FakeEpmRpc(_AsyncFakeRpc):
+        async def __aenter__(self) -> FakeEpmRpc:
+            return self
+
+        async def __aexit__(self, *args: t.Any) -> None:
+            await self.close()
+
+        async def bind(self, *args: t.Any, **kwargs: t.Any) -> None:
+            return None
+
+    bound_ports = []
+    new_rpc = _AsyncFakeRpc()
+
+    async def bind_isd_key(server: str, port: int, *args: t.Any) -> _AsyncFakeRpc:
+        bound_ports.append(port)
+        if port == 1:
+            raise asyncio.TimeoutError()
+
+        return new_rpc
+
+    async def create_rpc_connection(*args: t.Any, **kwargs: t.Any) -> FakeEpmRpc:
+        return FakeEpmRpc()
+
+    monkeypatch.setattr(client, "_async_bind_isd_key", bind_isd_key)
+    monkeypatch.setattr(client, "async_create_rpc_connection", create_rpc_connection)
+    monkeypatch.setattr(client, "_process_bind_result", lambda *args: None)
+    monkeypatch.setattr(client, "_process_ept_map_result", lambda resp: 2)
+
+    pool = client._RpcPool()
+    pool.set_isd_key_port("dc", 1)
+
+    actual = await client._async_connect_isd_key("dc", None, None, "negotiate", pool)
+    assert actual is new_rpc
+    assert bound_ports == [1, 2]
+    assert pool.get_isd_key_port("dc") == 2
+
+
+def test_key_cache_get_key_concurrent_threads(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha256_nonce")
+    blob = dpapi_ng._blob.DPAPINGBlob.unpack(data)
+    key_id = blob.key_identifier
+
+    compute_l1_key = client.compute_l1_key
+    calls = 0
+
+    def counting_compute_l1_key(*args: t.Any, **kwargs: t.Any) -> bytes:
+        nonlocal calls
+        calls += 1
+        time.sleep(0.01)
+        return compute_l1_key(*args, **kwargs)
+
+    monkeypatch.setattr(client, "compute_l1_key", counting_compute_l1_key)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        actual = list(executor.map(lambda _: dpapi_ng.ncrypt_unprotect_secret(data, cache=key_cache), range(8)))
+
+    assert actual == [b"\x00"] * 8
+    assert calls == 1
+
+
+def test_unprotect_secret_caches_cek(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    data, key_cache = _load_root_key("kdf_sha512_dh")
+
+    assert dpapi_ng.ncrypt_unprotect_secret(data, cache=key_cache) == b"\x00"
+    assert len(key_cache._ceks) == 1
+
+    def get_kek(*args: t.Any, **kwargs: t.Any) -> bytes:
+        raise Exception("should not be called")
+
+    monkeypatch.setattr(gkdi.GroupKeyEnvelope, "get_kek", get_kek)
+    assert dpapi_ng.ncrypt_unprotect_secret(data, cache=key_cache) == b"\x00"
+
+
+def test_key_cache_cek_eviction(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(client, "_CEK_CACHE_SIZE", 1)
+
+    data1, key_cache = _load_root_key("kdf_sha1_nonce")
+    data2, key_cache2 = _load_root_key("kdf_sha256_nonce")
+    key_cache._root_keys.update(key_cache2._root_keys)
+    blob1 = dpapi_ng._blob.DPAPINGBlob.unpack(data1)
+    blob2 = dpapi_ng._blob.DPAPINGBlob.unpack(data2)
+
+    dpapi_ng.ncrypt_unprotect_secrets([data1, data2], cache=key_cache)
+    assert len(key_cache._ceks) == 1
+    assert key_cache._get_cek(blob1) is None
+    assert key_cache._get_cek(blob2) is not None
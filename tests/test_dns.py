@@ -0,0 +1,82 @@
+# Copyright: (c) 2023, Jordan Borean (@jborean93) <jborean93@gmail.com>
+# MIT License (see LICENSE or https://opensource.org/licenses/MIT)
+
+from __future__ import annotations
+
+import time
+import typing as t
+
+import dns.asyncresolver
+import dns.resolver
+import pytest
+
+import dpapi_ng._dns as dpapi_dns
+
+
+class _FakeSrv(t.NamedTuple):
+    target: str
+    port: int
+    weight: int
+    priority: int
+
+
+class _FakeAnswer(t.List[_FakeSrv]):
+    def __init__(self, records: t.List[_FakeSrv], ttl: int) -> None:
+        super().__init__(records)
+        self.expiration = time.time() + ttl
+
+
+def _patch_resolve(
+    monkeypatch: pytest.MonkeyPatch,
+    ttl: int,
+) -> t.List[str]:
+    queries: t.List[str] = []
+
+    def resolve(qname: str, *args: t.Any, **kwargs: t.Any) -> _FakeAnswer:
+        queries.append(qname)
+        return _FakeAnswer(
+            [
+                _FakeSrv("dc02.domain.test.", 389, 100, 10),
+                _FakeSrv("dc01.domain.test.", 389, 100, 0),
+            ],
+            ttl,
+        )
+
+    async def async_resolve(qname: str, *args: t.Any, **kwargs: t.Any) -> _FakeAnswer:
+        return resolve(qname, *args, **kwargs)
+
+    monkeypatch.setattr(dpapi_dns, "_DC_CACHE", {})
+    monkeypatch.setattr(dns.resolver, "resolve", resolve)
+    monkeypatch.setattr(dns.asyncresolver, "resolve", async_resolve)
+
+    return queries
+
+
+def test_lookup_dc_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = _patch_resolve(monkeypatch, 600)
+
+    actual = dpapi_dns.lookup_dc("domain.test")
+    assert actual == dpapi_dns.SrvRecord("dc01.domain.test", 389, 100, 0)
+    assert dpapi_dns.lookup_dc("domain.test") is actual
+    assert queries == ["_ldap._tcp.dc._msdcs.domain.test"]
+
+    dpapi_dns.lookup_dc()
+    assert queries == ["_ldap._tcp.dc._msdcs.domain.test", "_ldap._tcp.dc._msdcs"]
+
+
+def test_lookup_dc_expired(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = _patch_resolve(monkeypatch, 0)
+
+    dpapi_dns.lookup_dc("domain.test")
+    dpapi_dns.lookup_dc("domain.test")
+    assert len(queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_lookup_dc_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = _patch_resolve(monkeypatch, 600)
+
+    actual = await dpapi_dns.async_lookup_dc("domain.test")
+    assert actual == dpapi_dns.SrvRecord("dc01.domain.test", 389, 100, 0)
+    assert dpapi_dns.lookup_dc("domain.test") is actual
+    assert queries == ["_ldap._tcp.dc._msdcs.domain.test"]
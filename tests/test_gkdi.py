@@ -445,7 +445,7 @@ def test_group_key_envelope_get_kek_is_public() -> None:
     )
 
     with pytest.raises(ValueError, match="Current user is not authorized to retrieve the KEK information"):
-        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0), b"", "", ""))
+        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0).bytes_le, b"", "", ""))
 
 
 def test_group_key_envelope_get_kek_l0_mismatch() -> None:
@@ -469,7 +469,7 @@ def test_group_key_envelope_get_kek_l0_mismatch() -> None:
     )
 
     with pytest.raises(ValueError, match="L0 index 1 does not match the requested L0 index 0"):
-        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0), b"", "", ""))
+        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0).bytes_le, b"", "", ""))
 
 
 def test_group_key_envelope_get_kek_invalid_kdf() -> None:
@@ -493,7 +493,7 @@ def test_group_key_envelope_get_kek_invalid_kdf() -> None:
     )
 
     with pytest.raises(NotImplementedError, match="Unknown KDF algorithm 'test'"):
-        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0), b"", "", ""))
+        envelope.get_kek(blob.KeyIdentifier(1, 1, 0, 0, 0, uuid.UUID(int=0).bytes_le, b"", "", ""))
 
 
 # See tests/integration/files/generate_seed_keys.py on how to generate the
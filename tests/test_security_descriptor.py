@@ -80,3 +80,16 @@ def test_sd_to_bytes_no_dacl() -> None:
         sacl=[security_descriptor.ace_to_bytes("S-1-5-18", 1)],
     )
     assert actual == expected
+
+
+def test_protection_sd_to_bytes() -> None:
+    sid = "S-1-5-21-4151808797-3430561092-2843464588-1104"
+    expected = security_descriptor.sd_to_bytes(
+        owner="S-1-5-18",
+        group="S-1-5-18",
+        dacl=[security_descriptor.ace_to_bytes(sid, 3), security_descriptor.ace_to_bytes("S-1-1-0", 2)],
+    )
+
+    actual = security_descriptor.protection_sd_to_bytes(sid)
+    assert actual == expected
+    assert security_descriptor.protection_sd_to_bytes(sid) is actual